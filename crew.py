@@ -1,9 +1,20 @@
 from crewai import Agent, Task, Process, Crew, LLM
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import os
+import time
 import yaml
+from crewai.knowledge.source.base_knowledge_source import BaseKnowledgeSource
 from utils.document_processor import DocumentProcessor
-from utils.watson_llm import get_llm, get_embedder
+from utils.knowledge_sources import IndexArtifactKnowledgeSource
+from utils.metrics import (
+    KNOWLEDGE_LOAD_DURATION,
+    LLM_TOKENS,
+    MODEL_ESCALATIONS,
+    MODEL_TIER_DURATION,
+    REQUEST_DURATION,
+    REQUESTS,
+)
+from utils.watson_llm import get_llm, get_embedder, get_router
 
 
 class SafeDict(dict):
@@ -22,7 +33,8 @@ class AcademicCrew:
         self.agents_config_path = "config/agents.yaml"
         self.tasks_config_path = "config/tasks.yaml"
         
-        self.llm = get_llm()
+        self.router = get_router()
+        self.last_run_info: Dict[str, Any] = {}
         self._load_configs()
         
     def _load_configs(self):
@@ -41,13 +53,13 @@ class AcademicCrew:
         agent_key = f"agente_{self.subject_id}"
         return self.agents_config.get(agent_key, {})
     
-    def create_subject_agent(self) -> Agent:
+    def create_subject_agent(self, llm: Optional[LLM] = None) -> Agent:
         agent_config = self.get_subject_agent_config()
         return Agent(
             config=agent_config,
             verbose=True,
             tools=[],
-            llm=self.llm,
+            llm=llm or get_llm(),
         )
     
     def get_task_config(self, task_key: str) -> Dict[str, Any]:
@@ -91,23 +103,45 @@ class AcademicCrew:
             task_obj.agent = agent
         return task_obj
 
+    def load_knowledge_sources(self) -> List[BaseKnowledgeSource]:
+        if self.subject_id == "geral":
+            return self.doc_processor.get_all_knowledge_sources()
+        return self.doc_processor.get_knowledge_sources_for_subject(self.subject_id)
+
+    def _observe_knowledge_load(self, knowledge_sources: List[BaseKnowledgeSource], start_ts: float) -> None:
+        if not knowledge_sources:
+            source_kind = "none"
+        elif isinstance(knowledge_sources[0], IndexArtifactKnowledgeSource):
+            source_kind = "index"
+        else:
+            source_kind = "pdf"
+        KNOWLEDGE_LOAD_DURATION.observe(time.perf_counter() - start_ts, subject=self.subject_id, source=source_kind)
+
     def create_crew(
         self,
         task_key: str = "elaborar_explicacao_tecnica",
-        inputs: Optional[Dict[str, Any]] = None
+        inputs: Optional[Dict[str, Any]] = None,
+        knowledge_sources: Optional[List[BaseKnowledgeSource]] = None,
+        llm: Optional[LLM] = None
     ) -> Crew:
+        """
+        Monta o crew da matéria. Se `knowledge_sources` não for informado, as fontes
+        são carregadas aqui e o tempo de carga é registrado; fontes já carregadas
+        podem ser reaproveitadas entre crews sem nova ingestão.
+        """
         if inputs is None:
             inputs = {}
 
-        if self.subject_id == "geral":
-            knowledge_sources = self.doc_processor.get_all_knowledge_sources()
-        else:
-            knowledge_sources = self.doc_processor.get_knowledge_sources_for_subject(self.subject_id)
+        knowledge_start_ts = None
+        if knowledge_sources is None:
+            knowledge_start_ts = time.perf_counter()
+            knowledge_sources = self.load_knowledge_sources()
 
-        agent = self.create_subject_agent()
+        agent = self.create_subject_agent(llm)
         task_obj = self.create_academic_task(task_key, inputs, agent)
 
-        return Crew(
+        # O Crew ingere as fontes de conhecimento no construtor, então ele entra na medição
+        crew = Crew(
             agents=[agent],
             tasks=[task_obj],
             process=Process.sequential,
@@ -115,17 +149,80 @@ class AcademicCrew:
             knowledge_sources=knowledge_sources,
             embedder=get_embedder()
         )
+        if knowledge_start_ts is not None:
+            self._observe_knowledge_load(knowledge_sources, knowledge_start_ts)
+        return crew
 
     def run(self, question: str, task_key: str = "elaborar_explicacao_tecnica") -> str:
         """
         Conveniência: monta os inputs a partir da pergunta, cria o crew e dispara o kickoff.
+
+        O modelo é escolhido pelo roteador (utils/model_router.py) conforme a tarefa e a
+        complexidade da pergunta; respostas truncadas ou de baixa confiança são refeitas
+        na camada seguinte. Os detalhes da execução ficam em `last_run_info`.
+
+        Duração e status (ok/error) de cada chamada são registrados aqui, ponto comum
+        ao main.py e ao app.py.
         """
+        start_ts = time.perf_counter()
+        status = "error"
+        try:
+            result = self._run(question, task_key)
+            status = "ok"
+            return result
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start_ts, subject=self.subject_id, task_key=task_key)
+            REQUESTS.inc(subject=self.subject_id, task_key=task_key, status=status)
+
+    def _run(self, question: str, task_key: str) -> str:
         inputs = {
             "enunciado": question,
             "topico": question
         }
-        crew = self.create_crew(task_key, inputs)
-        result = crew.kickoff(inputs=inputs)
+        decision = self.router.route(task_key, question)
+        tier = decision.tier
+        attempts = []
+
+        # As fontes são carregadas uma vez; a cada tentativa só o agente e a tarefa
+        # são refeitos com o LLM da camada (as fontes não reingerem no storage já populado)
+        knowledge_start_ts = time.perf_counter()
+        knowledge_sources = self.load_knowledge_sources()
+
+        while True:
+            crew = self.create_crew(task_key, inputs, knowledge_sources=knowledge_sources, llm=get_llm(tier))
+            if knowledge_start_ts is not None:
+                self._observe_knowledge_load(knowledge_sources, knowledge_start_ts)
+                knowledge_start_ts = None
+            start_ts = time.perf_counter()
+            result = crew.kickoff(inputs=inputs)
+            duration = time.perf_counter() - start_ts
+            self.router.record_latency(tier, duration)
+            MODEL_TIER_DURATION.observe(duration, tier=tier.name)
+
+            usage = getattr(result, "token_usage", None)
+            labels = {"subject": self.subject_id, "task_key": task_key, "tier": tier.name}
+            LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, kind="prompt", **labels)
+            LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, kind="completion", **labels)
+            reason = self.router.escalation_reason(
+                tier,
+                str(result),
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                llm_calls=getattr(usage, "successful_requests", 1) or 1,
+            )
+            attempts.append({"tier": tier.name, "model": tier.model, "duration": duration, "escalation_reason": reason})
+
+            next_tier = self.router.next_tier(tier) if reason else None
+            if next_tier is None or len(attempts) > self.router.max_escalations:
+                break
+            MODEL_ESCALATIONS.inc(tier=tier.name)
+            tier = next_tier
+
+        self.last_run_info = {
+            "tier": tier.name,
+            "model": tier.model,
+            "routing_reasons": decision.reasons,
+            "attempts": attempts,
+        }
         return str(result)
     
     def get_available_subjects(self) -> Dict[str, Dict]:
@@ -25,9 +25,89 @@ def slugify(text: str) -> str:
     return text
 
 
+def build_main(argv):
+    """
+    Subcomando `build`: gera o artefato de índice (texto extraído, chunks,
+    embeddings e manifest) de uma matéria, ou de todas com "geral".
+    """
+    # Imports tardios: o build depende do CrewAI/watsonx, a criação de metadata não
+    from utils.document_processor import DocumentProcessor
+    from utils.index_artifact import IndexArtifact, IndexArtifactError, build_index_artifact
+    from utils.ingestion import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE, IngestionConfig
+    from utils.watson_llm import get_embed_model, get_embeddings_client
+
+    parser = argparse.ArgumentParser(
+        prog="criar_materia.py build",
+        description="Gera o índice pré-construído de uma matéria para uso direto pelos workers."
+    )
+    parser.add_argument(
+        "subject",
+        nargs="+",
+        help="Nome ou código da matéria (ex: 'Cálculo' ou calculo). Use 'geral' para indexar todas."
+    )
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Tamanho de cada chunk em caracteres.")
+    parser.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP, help="Sobreposição entre chunks em caracteres.")
+    parser.add_argument("--batch-size", type=int, help="Máximo de chunks por lote/chamada ao embedder (default: INGEST_BATCH_SIZE ou 32).")
+    parser.add_argument("--max-batch-mb", type=float, help="Máximo de texto por lote em MB (default: INGEST_MAX_BATCH_MB ou 8).")
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=float,
+        help="Teto de memória residente; acima dele os lotes encolhem (default: INGEST_MEMORY_LIMIT_MB ou sem teto)."
+    )
+    args = parser.parse_args(argv)
+
+    subject_raw = " ".join(args.subject).strip()
+    code = "geral" if subject_raw == "geral" else slugify(subject_raw)
+
+    doc_processor = DocumentProcessor(str(KNOWLEDGE_ROOT))
+    if code != "geral" and not (KNOWLEDGE_ROOT / code).is_dir():
+        print(f"[!] A matéria '{code}' não existe em {KNOWLEDGE_ROOT}. Crie-a primeiro.")
+        sys.exit(1)
+
+    pdf_paths = doc_processor.get_pdf_paths(code)
+    if not pdf_paths:
+        print(f"[!] Nenhum PDF encontrado para '{code}'.")
+        sys.exit(1)
+
+    output_dir = doc_processor.get_index_path(code)
+    embed_model = get_embed_model()
+    embeddings_client = get_embeddings_client()
+
+    print(f"[*] Indexando {len(pdf_paths)} PDF(s) de '{code}' com {embed_model}...")
+    try:
+        build_index_artifact(
+            pdf_paths=pdf_paths,
+            knowledge_base_path=KNOWLEDGE_ROOT,
+            output_dir=output_dir,
+            embed_fn=lambda texts: embeddings_client.embed_documents(texts=texts),
+            embed_model=embed_model,
+            subject=code,
+            config=IngestionConfig(
+                batch_size=args.batch_size,
+                max_batch_mb=args.max_batch_mb,
+                memory_limit_mb=args.memory_limit_mb,
+                chunk_size=args.chunk_size,
+                chunk_overlap=args.chunk_overlap,
+            ),
+        )
+    except (IndexArtifactError, ValueError) as e:
+        print(f"[!] Erro ao gerar o índice: {e}")
+        sys.exit(1)
+
+    manifest = IndexArtifact.open(output_dir).manifest
+    print(f"[+] Índice gerado em: {output_dir}")
+    print(f"    versão {manifest['fingerprint']}: {manifest['num_chunks']} chunks, dimensão {manifest['embedding_dim']}")
+
+
 def main():
+    # `criar_materia.py build <matéria>` gera o índice; sem subcomando, cria o metadata
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
-        description="Cria/atualiza metadata.yaml básico de uma matéria com apenas name, code e description."
+        description="Cria/atualiza metadata.yaml básico de uma matéria com apenas name, code e description.",
+        epilog="Para gerar o índice pré-construído de uma matéria: criar_materia.py build <matéria>"
     )
     parser.add_argument(
         "subject",
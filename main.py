@@ -4,6 +4,7 @@ import time
 from typing import Optional
 
 from crew import AcademicCrew
+from utils.metrics import start_metrics_exporter
 
 
 def setup_logger() -> logging.Logger:
@@ -74,6 +75,9 @@ logger = setup_logger()
 context_filter = ContextFilter()
 logger.addFilter(context_filter)
 
+# Exporta métricas (endpoint HTTP e/ou arquivo) se configurado no ambiente
+start_metrics_exporter()
+
 
 def run_academic_assistant(
     question: str,
@@ -105,6 +109,15 @@ def run_academic_assistant(
 
         duration = time.perf_counter() - start_ts
         logger.info(f"Kickoff concluído em {duration:.2f}s", extra={"subject": subject_id, "task_key": task_key})
+        run_info = crew_instance.last_run_info
+        if run_info:
+            logger.info(
+                f"Modelo: camada={run_info['tier']} ({run_info['model']}), "
+                f"tentativas={[(a['tier'], round(a['duration'], 2), a['escalation_reason']) for a in run_info['attempts']]}, "
+                f"roteamento={run_info['routing_reasons']}",
+                extra={"subject": subject_id, "task_key": task_key}
+            )
+            logger.debug(f"Latência por camada: {crew_instance.router.latency_stats()}", extra={"subject": subject_id, "task_key": task_key})
         logger.debug(f"Resultado bruto: {result}", extra={"subject": subject_id, "task_key": task_key})
 
         return str(result)
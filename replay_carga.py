@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Replay de carga: simula estudantes concorrentes reexecutando um log de perguntas.
+
+Cada linha do log (JSONL) é uma pergunta, por exemplo:
+    {"question": "defina limite", "subject": "calculo", "task_key": "elaborar_explicacao_tecnica"}
+Também são aceitos "pergunta"/"subject_id" e, com --usar-tempos, um "timestamp"
+(epoch em segundos ou ISO 8601) para reproduzir os intervalos originais.
+
+Por padrão sobe um watsonx simulado local (utils/mock_watsonx.py) e aponta o
+LLM e o embedder para ele (ver `configure_mock_environment`); o fluxo completo
+contra o mock é coberto por tests/test_replay_carga.py, que exige o crewai
+instalado. Ao final, reporta vazão, latências p50/p95/p99 e taxa de erro por matéria.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ERROR_PREFIX = "Erro interno ao processar a pergunta"
+
+
+def load_question_log(path: Path) -> List[Dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+            except ValueError as e:
+                print(f"[!] Linha {line_number} ignorada (JSON inválido): {e}")
+                continue
+            question = raw.get("question") or raw.get("pergunta")
+            if not question:
+                print(f"[!] Linha {line_number} ignorada (sem 'question').")
+                continue
+            records.append({
+                "question": question,
+                "subject": raw.get("subject") or raw.get("subject_id") or "geral",
+                "task_key": raw.get("task_key") or "elaborar_explicacao_tecnica",
+                "timestamp": _parse_timestamp(raw.get("timestamp")),
+            })
+    return records
+
+
+def _parse_timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def arrival_schedule(
+    records: List[Dict],
+    repetitions: int,
+    rate: float,
+    use_timestamps: bool,
+    speedup: float,
+    rng: random.Random,
+) -> List[Tuple[Dict, float]]:
+    """
+    Pares (pergunta, instante de chegada em segundos desde o início), em ordem de chegada.
+
+    Com --usar-tempos, o log é ordenado pelo timestamp e cada repetição começa
+    depois da anterior, deslocada pela duração do log mais um intervalo médio.
+    Sem tempos, usa um processo de Poisson com a taxa pedida, ou tudo em t=0
+    (taxa 0: limitado só pela concorrência).
+    """
+    repetitions = max(1, repetitions)
+    if use_timestamps:
+        missing = sum(1 for r in records if r["timestamp"] is None)
+        if missing:
+            print(f"[!] {missing} pergunta(s) sem 'timestamp' válido; usando chegadas de Poisson (--taxa) em vez de --usar-tempos.")
+        else:
+            ordered = sorted(records, key=lambda r: r["timestamp"])
+            first = ordered[0]["timestamp"]
+            span = ordered[-1]["timestamp"] - first
+            period = span + (span / (len(ordered) - 1) if len(ordered) > 1 else 0.0)
+            return [
+                (r, (r["timestamp"] - first + repetition * period) / speedup)
+                for repetition in range(repetitions)
+                for r in ordered
+            ]
+
+    records = records * repetitions
+    if rate <= 0:
+        return [(r, 0.0) for r in records]
+    schedule, t = [], 0.0
+    for r in records:
+        schedule.append((r, t))
+        t += rng.expovariate(rate)
+    return schedule
+
+
+def replay(schedule: List[Tuple[Dict, float]], target, concurrency: int) -> Tuple[List[Dict], float]:
+    """Dispara as perguntas nos instantes agendados; devolve os resultados e a duração total."""
+    results: List[Dict] = []
+    results_lock = threading.Lock()
+
+    def run_one(record: Dict, arrival: float) -> None:
+        started = time.perf_counter()
+        error = False
+        try:
+            response = target(record["question"], record["subject"], record["task_key"])
+            error = str(response).startswith(ERROR_PREFIX)
+        except Exception as e:
+            print(f"[!] {record['subject']}: {e}", file=sys.stderr)
+            error = True
+        finished = time.perf_counter()
+        with results_lock:
+            results.append({
+                "subject": record["subject"],
+                "task_key": record["task_key"],
+                # latência percebida pelo estudante: da chegada até a resposta, incluindo fila
+                "latency": finished - arrival,
+                "queue_wait": started - arrival,
+                "error": error,
+            })
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record, offset in schedule:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run_one, record, start + offset)
+    return results, time.perf_counter() - start
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por posto mais próximo (valores já ordenados)."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def configure_mock_environment(base_url: str) -> None:
+    """Aponta o LLM e o embedder para o watsonx simulado. Precisa rodar antes de importar o crew."""
+    os.environ["WATSONX_API_BASE"] = base_url
+    os.environ["WATSONX_URL"] = base_url
+    os.environ["WATSONX_APIKEY"] = "mock-apikey"
+    os.environ["WATSONX_PROJECT_ID"] = "mock-project"
+    # Evita a troca de API key por token no IAM público
+    os.environ["WATSONX_TOKEN"] = "mock-token"
+    os.environ["WATSONX_IAM_URL"] = f"{base_url}/identity/token"
+    os.environ.setdefault("ACADEMIC_ASSISTANT_LOG_LEVEL", "WARNING")
+
+
+def build_target(name: str):
+    """Função (pergunta, matéria, tarefa) -> resposta para o fluxo escolhido."""
+    from main import run_academic_assistant
+
+    if name == "streamlit":
+        from crew import AcademicCrew
+
+        # Mesmo caminho do app.py: AcademicCrew.run com fallback para o wrapper
+        def target(question: str, subject: str, task_key: str) -> str:
+            crew_manager = AcademicCrew(subject_id=subject)
+            try:
+                return crew_manager.run(question=question, task_key=task_key)
+            except AttributeError:
+                return run_academic_assistant(question, subject, task_key)
+        return target
+
+    return run_academic_assistant
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    by_subject: Dict[str, List[Dict]] = {}
+    for r in results:
+        by_subject.setdefault(r["subject"], []).append(r)
+
+    def stats(rows: List[Dict]) -> Dict:
+        latencies = sorted(r["latency"] for r in rows)
+        errors = sum(1 for r in rows if r["error"])
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": errors / len(rows) if rows else 0.0,
+            "throughput_rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean_queue_wait": sum(r["queue_wait"] for r in rows) / len(rows) if rows else 0.0,
+        }
+
+    return {
+        "elapsed_seconds": elapsed,
+        "total": stats(results),
+        "subjects": {subject: stats(rows) for subject, rows in sorted(by_subject.items())},
+    }
+
+
+def print_report(report: Dict) -> None:
+    header = f"{'matéria':<20} {'req':>6} {'erros':>6} {'%erro':>7} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'fila':>7}"
+    print(f"\nDuração: {report['elapsed_seconds']:.1f}s")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["subjects"].items()) + [("TOTAL", report["total"])]
+    for subject, s in rows:
+        print(
+            f"{subject:<20} {s['requests']:>6} {s['errors']:>6} {100 * s['error_rate']:>6.1f}% "
+            f"{s['throughput_rps']:>7.2f} {s['p50']:>7.2f}s {s['p95']:>7.2f}s {s['p99']:>7.2f}s {s['mean_queue_wait']:>6.2f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reexecuta um log de perguntas (JSONL) com estudantes concorrentes e mede vazão, latência e erros."
+    )
+    parser.add_argument("log", type=Path, help="Arquivo JSONL com as perguntas gravadas.")
+    parser.add_argument("--alvo", choices=["assistente", "streamlit"], default="assistente",
+                        help="run_academic_assistant (main.py) ou o fluxo do app.py (AcademicCrew.run).")
+    parser.add_argument("--taxa", type=float, default=1.0,
+                        help="Chegadas por segundo (processo de Poisson). 0 envia tudo de uma vez.")
+    parser.add_argument("--concorrencia", type=int, default=8, help="Máximo de requisições simultâneas.")
+    parser.add_argument("--usar-tempos", action="store_true",
+                        help="Reproduz os intervalos do campo 'timestamp' do log em vez de --taxa.")
+    parser.add_argument("--aceleracao", type=float, default=1.0, help="Divide os intervalos originais (com --usar-tempos).")
+    parser.add_argument("--repeticoes", type=int, default=1, help="Quantas vezes percorrer o log.")
+    parser.add_argument("--max-requisicoes", type=int, help="Limita o total de requisições.")
+    parser.add_argument("--sem-mock", action="store_true",
+                        help="Não sobe o watsonx simulado; usa a configuração do ambiente (.env).")
+    parser.add_argument("--escala-latencia", type=float, default=1.0, help="Multiplicador das latências simuladas.")
+    parser.add_argument("--taxa-erro-mock", type=float, default=0.0, help="Fração de chamadas simuladas que falham.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente das chegadas e das latências simuladas.")
+    parser.add_argument("--saida", type=Path, help="Grava o relatório completo em JSON.")
+    args = parser.parse_args()
+
+    records = load_question_log(args.log)
+    if not records:
+        print("[!] Nenhuma pergunta válida no log.")
+        sys.exit(1)
+    schedule = arrival_schedule(
+        records, args.repeticoes, args.taxa, args.usar_tempos, args.aceleracao, random.Random(args.seed)
+    )
+    if args.max_requisicoes:
+        schedule = schedule[:args.max_requisicoes]
+
+    mock_state = None
+    if not args.sem_mock:
+        from utils.mock_watsonx import start_mock_server
+
+        server, mock_state = start_mock_server(
+            latency_scale=args.escala_latencia, error_rate=args.taxa_erro_mock, seed=args.seed
+        )
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        configure_mock_environment(base_url)
+        print(f"[*] watsonx simulado em {base_url}")
+
+    target = build_target(args.alvo)
+    print(f"[*] Reexecutando {len(schedule)} pergunta(s) com concorrência {args.concorrencia}...")
+    results, elapsed = replay(schedule, target, args.concorrencia)
+
+    report = summarize(results, elapsed)
+    if mock_state is not None:
+        report["mock"] = {"llm_requests": mock_state.requests, "injected_errors": mock_state.errors}
+    print_report(report)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[+] Relatório gravado em: {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pytest
+
+import utils.index_artifact as index_artifact
+from utils.index_artifact import (
+    CURRENT_FILE,
+    IndexArtifact,
+    IndexArtifactError,
+    build_index_artifact,
+    read_current_version,
+)
+from utils.ingestion import IngestionConfig, chunk_text
+
+PAGES = ["Limite de uma funcao " * 8, "Derivada como taxa de variacao " * 8]
+
+
+def _embed(texts):
+    return [[float(len(t)), float(sum(map(ord, t)) % 997), 1.0] for t in texts]
+
+
+@pytest.fixture
+def knowledge(tmp_path, make_pdf):
+    kb = tmp_path / "knowledge"
+    pdf = make_pdf(kb / "calculo" / "notas.pdf", PAGES)
+    return kb, pdf
+
+
+def _build(kb, pdf, embed_model="modelo-teste"):
+    config = IngestionConfig(chunk_size=80, chunk_overlap=20, batch_size=3)
+    return build_index_artifact(
+        [pdf], kb, kb / "calculo" / ".index", _embed, embed_model, "calculo",
+        config=config, on_progress=lambda p: None,
+    )
+
+
+def test_build_open_validate_round_trip(knowledge):
+    kb, pdf = knowledge
+    index_dir = _build(kb, pdf)
+
+    artifact = IndexArtifact.open(index_dir)
+    chunks = list(artifact.iter_chunks())
+    assert chunks == chunk_text("\n".join(PAGES), 80, 20)
+    assert artifact.embed_model == "modelo-teste"
+    assert artifact.manifest["num_chunks"] == len(chunks)
+    assert [s["path"] for s in artifact.manifest["sources"]] == ["calculo/notas.pdf"]
+    np.testing.assert_array_equal(artifact.embeddings, np.asarray(_embed(chunks), dtype=np.float32))
+
+    artifact.validate("modelo-teste", kb, chunk_size=80, chunk_overlap=20, pdf_paths=[pdf])
+
+
+def test_rebuild_swaps_current_pointer_and_prunes_old_versions(knowledge):
+    kb, pdf = knowledge
+    index_dir = _build(kb, pdf)
+    first = read_current_version(index_dir)
+    _build(kb, pdf)
+    second = read_current_version(index_dir)
+    _build(kb, pdf)
+    third = read_current_version(index_dir)
+
+    assert len({first, second, third}) == 3
+    assert (index_dir / CURRENT_FILE).read_text(encoding="utf-8").strip() == third
+    # A versão anterior fica para leitores que já a abriram; as mais antigas saem
+    assert sorted(p.name for p in index_dir.iterdir() if p.is_dir()) == sorted([second, third])
+    assert IndexArtifact.open(index_dir).path.name == third
+
+
+def test_rebuild_removes_leftovers_of_killed_builds(knowledge):
+    kb, pdf = knowledge
+    index_dir = kb / "calculo" / ".index"
+    # Build morto antes do finalize (sem abort) e um build concorrente mais recente
+    stale = index_dir / ".tmp-v1"
+    stale.mkdir(parents=True)
+    (stale / "chunks.jsonl").write_text("{}\n", encoding="utf-8")
+    (index_dir / ".CURRENT.v1").write_text("v1\n", encoding="utf-8")
+    newer = index_dir / f".tmp-v{10**20}"
+    newer.mkdir()
+
+    _build(kb, pdf)
+
+    assert not stale.exists()
+    assert not (index_dir / ".CURRENT.v1").exists()
+    assert newer.exists()
+
+
+def test_validate_rejects_mismatches(knowledge, make_pdf):
+    kb, pdf = knowledge
+    artifact = IndexArtifact.open(_build(kb, pdf))
+
+    with pytest.raises(IndexArtifactError, match="modelo"):
+        artifact.validate("outro-modelo", kb)
+    with pytest.raises(IndexArtifactError, match="chunk_size"):
+        artifact.validate("modelo-teste", kb, chunk_size=100)
+
+    extra = make_pdf(kb / "calculo" / "extra.pdf", ["Texto novo"])
+    with pytest.raises(IndexArtifactError, match="não está no artefato"):
+        artifact.validate("modelo-teste", kb, pdf_paths=[pdf, extra])
+
+    make_pdf(pdf, PAGES + ["Pagina acrescentada"])
+    with pytest.raises(IndexArtifactError, match="mudou"):
+        artifact.validate("modelo-teste", kb)
+
+
+def test_validate_hashes_sources_once_per_stat(knowledge, monkeypatch):
+    kb, pdf = knowledge
+    artifact = IndexArtifact.open(_build(kb, pdf))
+    # Simula uma cópia para outra máquina: mesmo conteúdo, mtime diferente
+    stat = pdf.stat()
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    calls = []
+    original = index_artifact.file_sha256
+    monkeypatch.setattr(index_artifact, "file_sha256", lambda path: calls.append(path) or original(path))
+
+    artifact.validate("modelo-teste", kb)
+    artifact.validate("modelo-teste", kb)
+    assert len(calls) == 1
+
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    artifact.validate("modelo-teste", kb)
+    assert len(calls) == 2
+
+
+def test_open_without_published_version(tmp_path):
+    with pytest.raises(IndexArtifactError, match="Nenhuma versão"):
+        IndexArtifact.open(tmp_path / ".index")
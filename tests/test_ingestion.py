@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+import utils.ingestion as ingestion
+from utils.ingestion import IngestionConfig, IngestionSink, MemoryGuard, chunk_text, ingest, iter_text_chunks
+
+
+class _ListSink(IngestionSink):
+    def __init__(self):
+        self.pages = []
+        self.batches = []
+
+    def write_document(self, source, page, text):
+        self.pages.append((source, page, text))
+
+    def write_batch(self, chunks, vectors):
+        self.batches.append((chunks, vectors))
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_iter_text_chunks_matches_chunk_text(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.randint(2, 60)
+    chunk_overlap = rng.randint(0, chunk_size - 1)
+    pages = ["".join(rng.choice("abc xyz") for _ in range(rng.randint(0, 150))) for _ in range(rng.randint(0, 6))]
+
+    streamed = list(iter_text_chunks(iter(pages), chunk_size, chunk_overlap))
+
+    assert streamed == chunk_text("\n".join(pages), chunk_size, chunk_overlap)
+
+
+def test_chunk_text_rejects_overlap_not_smaller_than_size():
+    with pytest.raises(ValueError):
+        chunk_text("abc", chunk_size=10, chunk_overlap=10)
+
+
+def test_ingest_streams_pages_and_batches(tmp_path, make_pdf):
+    pages = ["limite e continuidade " * 5, "derivadas parciais " * 5, "integrais de linha " * 5]
+    pdf = make_pdf(tmp_path / "calculo" / "notas.pdf", pages)
+    sink = _ListSink()
+    config = IngestionConfig(chunk_size=50, chunk_overlap=10, batch_size=4)
+
+    progress = ingest(
+        [pdf], tmp_path, sink, embed_fn=lambda texts: [[float(len(t))] for t in texts],
+        config=config, on_progress=lambda p: None,
+    )
+
+    chunks = [c for batch, _ in sink.batches for c in batch]
+    assert [c["text"] for c in chunks] == chunk_text("\n".join(p for _, _, p in sink.pages), 50, 10)
+    assert all(len(batch) <= 4 for batch, _ in sink.batches)
+    assert all(vectors == [[float(len(c["text"]))] for c in batch] for batch, vectors in sink.batches)
+    assert {c["source"] for c in chunks} == {"calculo/notas.pdf"}
+    assert [page for _, page, _ in sink.pages] == [1, 2, 3]
+    assert progress.chunks == len(chunks) and progress.files_done == 1
+
+
+def test_memory_guard_halves_budget_when_over_limit(monkeypatch):
+    rss = [100.0]
+    monkeypatch.setattr(ingestion, "current_rss_mb", lambda: rss[0])
+    guard = MemoryGuard(IngestionConfig(batch_size=8, max_batch_mb=4, memory_limit_mb=50), check_interval=0)
+
+    assert guard.over_limit()
+    assert (guard.batch_size, guard.max_batch_bytes) == (4, 2 * 2**20)
+    for _ in range(5):
+        guard.over_limit()
+    assert guard.batch_size == 1
+
+    rss[0] = 10.0
+    assert not guard.over_limit()
+    assert guard.batch_size == 1
+
+
+def test_ingest_flushes_early_over_memory_limit(tmp_path, make_pdf, monkeypatch):
+    monkeypatch.setattr(ingestion, "current_rss_mb", lambda: 500.0)
+    pdf = make_pdf(tmp_path / "notas.pdf", ["serie de taylor " * 40])
+    sink = _ListSink()
+    config = IngestionConfig(chunk_size=40, chunk_overlap=0, batch_size=8, memory_limit_mb=100)
+
+    ingest([pdf], tmp_path, sink, config=config, on_progress=lambda p: None)
+
+    sizes = [len(batch) for batch, _ in sink.batches]
+    # O primeiro chunk já encontra o RSS acima do teto: lote descarregado na hora
+    # e orçamento dos seguintes reduzido à metade
+    assert sizes[0] == 1
+    assert max(sizes[1:]) <= 4
+    assert sum(sizes) == len(chunk_text(sink.pages[0][2], 40, 0))
@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("crewai")
+
+from utils.index_artifact import IndexArtifact, build_index_artifact  # noqa: E402
+from utils.ingestion import IngestionConfig  # noqa: E402
+from utils.knowledge_sources import ARTIFACT_MARKER_KEY, IndexArtifactKnowledgeSource  # noqa: E402
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.metadatas = {}
+        self.gets = 0
+        self.upserted = 0
+
+    def get(self, ids=None, where=None, limit=None, include=None):
+        self.gets += 1
+        if where is not None:
+            (key, value), = where.items()
+            found = [i for i, m in self.metadatas.items() if m and m.get(key) == value]
+            return {"ids": found[:limit]}
+        return {"ids": [i for i in ids if i in self.docs]}
+
+    def upsert(self, ids, documents, embeddings, metadatas=None):
+        for n, doc_id in enumerate(ids):
+            self.docs[doc_id] = documents[n]
+            self.metadatas[doc_id] = metadatas[n] if metadatas else None
+        self.upserted += len(ids)
+
+
+class _FakeStorage:
+    collection_name = "knowledge_crew"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+
+@pytest.fixture
+def artifact(tmp_path, make_pdf):
+    kb = tmp_path / "knowledge"
+    pdf = make_pdf(kb / "calculo" / "notas.pdf", ["Limite de uma funcao " * 20])
+    index_dir = build_index_artifact(
+        [pdf], kb, kb / "calculo" / ".index", lambda texts: [[1.0, 2.0] for _ in texts], "m", "calculo",
+        config=IngestionConfig(chunk_size=60, chunk_overlap=10), on_progress=lambda p: None,
+    )
+    return IndexArtifact.open(index_dir)
+
+
+def _add(artifact, collection):
+    # Cada requisição monta um AcademicCrew, e portanto uma fonte, novos
+    source = IndexArtifactKnowledgeSource(artifact=artifact, upsert_batch_size=4)
+    source.storage = _FakeStorage(collection)
+    source.add()
+
+
+def test_loaded_artifact_is_not_rescanned_by_new_sources(artifact):
+    collection = _FakeCollection()
+    _add(artifact, collection)
+    chunks = list(artifact.iter_chunks())
+    assert set(collection.docs.values()) == set(chunks)
+    assert [m for m in collection.metadatas.values() if m] == [{ARTIFACT_MARKER_KEY: artifact.manifest["fingerprint"]}]
+
+    gets, upserted = collection.gets, collection.upserted
+    _add(artifact, collection)
+    assert collection.gets == gets + 1
+    assert collection.upserted == upserted
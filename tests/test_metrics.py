@@ -0,0 +1,53 @@
+import pytest
+
+from utils.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latencia_seconds", "Latência.", ("tier",), buckets=(0.5, 1, 2.5))
+    for value in (0.2, 0.5, 0.7, 3.0):
+        histogram.observe(value, tier="rapido")
+    histogram.observe(1.5, tier="avancado")
+
+    assert histogram.render() == [
+        "# HELP latencia_seconds Latência.",
+        "# TYPE latencia_seconds histogram",
+        'latencia_seconds_bucket{tier="avancado",le="0.5"} 0',
+        'latencia_seconds_bucket{tier="avancado",le="1"} 0',
+        'latencia_seconds_bucket{tier="avancado",le="2.5"} 1',
+        'latencia_seconds_bucket{tier="avancado",le="+Inf"} 1',
+        'latencia_seconds_sum{tier="avancado"} 1.5',
+        'latencia_seconds_count{tier="avancado"} 1',
+        'latencia_seconds_bucket{tier="rapido",le="0.5"} 2',
+        'latencia_seconds_bucket{tier="rapido",le="1"} 3',
+        'latencia_seconds_bucket{tier="rapido",le="2.5"} 3',
+        'latencia_seconds_bucket{tier="rapido",le="+Inf"} 4',
+        'latencia_seconds_sum{tier="rapido"} 4.4',
+        'latencia_seconds_count{tier="rapido"} 4',
+    ]
+
+
+def test_counter_renders_and_escapes_labels():
+    counter = Counter("requisicoes_total", "Requisições.", ("subject", "status"))
+    counter.inc(subject="calculo", status="ok")
+    counter.inc(2, subject="calculo", status="ok")
+    counter.inc(subject='a"b\\c', status="error")
+
+    assert counter.value(subject="calculo", status="ok") == 3
+    assert counter.render()[2:] == [
+        'requisicoes_total{subject="a\\"b\\\\c",status="error"} 1',
+        'requisicoes_total{subject="calculo",status="ok"} 3',
+    ]
+
+
+def test_registry_renders_all_metrics_and_rejects_duplicates():
+    registry = MetricsRegistry()
+    registry.counter("a_total", "A.").inc()
+    registry.histogram("b_seconds", "B.", buckets=(1,)).observe(2)
+
+    text = registry.render_prometheus()
+    assert text.endswith("\n")
+    assert "a_total 1\n" in text
+    assert 'b_seconds_bucket{le="+Inf"} 1\n' in text
+    with pytest.raises(ValueError):
+        registry.counter("a_total", "A de novo.")
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.model_router import ModelRouter
+
+CONFIG = """
+tiers:
+  - name: rapido
+    model: modelo-8b
+    max_tokens: 100
+  - name: padrao
+  - name: avancado
+    model: modelo-405b
+    max_tokens: 400
+routing:
+  task_tiers:
+    elaborar_explicacao_tecnica: rapido
+    resolver_problemas: padrao
+  default_tier: padrao
+  short_question_chars: 120
+  long_question_chars: 600
+  math_symbols: ["\\\\", "∫", "^"]
+  math_symbol_threshold: 3
+  complex_keywords:
+    - [demonstre, prove]
+    - [teorema de stokes, jacobiano]
+  simple_keywords: [defina, o que é]
+  low_confidence_chars: 200
+  low_confidence_phrases: [não tenho certeza, não foi possível]
+  truncation_ratio: 0.9
+  max_escalations: 1
+"""
+
+
+@pytest.fixture
+def router(tmp_path, monkeypatch):
+    monkeypatch.delenv("WATSONX_ROUTING_ENABLED", raising=False)
+    path = tmp_path / "models.yaml"
+    path.write_text(CONFIG, encoding="utf-8")
+    return ModelRouter(SimpleNamespace(llm_model="modelo-env-70b", max_tokens=200), config_path=str(path))
+
+
+def test_tiers_inherit_environment_defaults(router):
+    assert [(t.name, t.model, t.max_tokens) for t in router.tiers] == [
+        ("rapido", "modelo-8b", 100),
+        ("padrao", "modelo-env-70b", 200),
+        ("avancado", "modelo-405b", 400),
+    ]
+    assert router.default_tier.name == "padrao"
+
+
+@pytest.mark.parametrize("task_key, question, tier", [
+    ("resolver_problemas", "Defina limite.", "rapido"),
+    ("resolver_problemas", "Calcule a derivada de x sen x.", "padrao"),
+    ("resolver_problemas", "Demonstre o teorema de Stokes.", "avancado"),
+    ("resolver_problemas", "Calcule ∫ x^2 dx e ∫ x^3 dx.", "avancado"),
+    ("elaborar_explicacao_tecnica", "Explique continuidade.", "rapido"),
+    ("elaborar_explicacao_tecnica", "Defina limite.", "rapido"),
+    ("tarefa_desconhecida", "Explique séries. " * 40, "avancado"),
+])
+def test_route(router, task_key, question, tier):
+    decision = router.route(task_key, question)
+    assert decision.tier.name == tier
+    assert decision.reasons[0].startswith(f"task_key={task_key}")
+
+
+def test_escalation_reason(router):
+    rapido = router.get_tier("rapido")
+    assert router.escalation_reason(rapido, "   ") == "resposta vazia"
+    assert router.escalation_reason(rapido, "ok", completion_tokens=95).startswith("truncada")
+    # Média por chamada ao LLM abaixo do limite: não conta como truncada
+    assert router.escalation_reason(rapido, "ok", completion_tokens=95, llm_calls=2) is None
+    assert router.escalation_reason(rapido, "Não tenho certeza da resposta.").startswith("baixa confiança")
+    assert router.escalation_reason(rapido, "A derivada é 2x.", completion_tokens=40) is None
+
+
+def test_low_confidence_only_checked_at_the_opening(router):
+    rapido = router.get_tier("rapido")
+    answer = (
+        "O limite de sen(x)/x quando x tende a 0 vale 1. Substituindo x = 0 obtemos a forma "
+        "indeterminada 0/0, então analisamos o comportamento da função perto da origem com "
+        "cuidado antes de concluir. Com a expansão de Taylor, sen(x) = x - x^3/6 + ..., e "
+        "não foi possível aplicar L'Hôpital diretamente sem antes justificar a derivabilidade."
+    )
+    assert router.escalation_reason(rapido, answer) is None
+    assert router.escalation_reason(rapido, "Não foi possível resolver a integral.").startswith("baixa confiança")
+
+
+def test_next_tier_stops_at_largest(router):
+    assert router.next_tier(router.get_tier("rapido")).name == "padrao"
+    assert router.next_tier(router.get_tier("avancado")) is None
+
+
+def test_routing_disabled_uses_single_environment_tier(tmp_path, monkeypatch):
+    monkeypatch.setenv("WATSONX_ROUTING_ENABLED", "false")
+    router = ModelRouter(SimpleNamespace(llm_model="modelo-env-70b", max_tokens=200), config_path=str(tmp_path / "x.yaml"))
+    assert [(t.name, t.model) for t in router.tiers] == [("padrao", "modelo-env-70b")]
+    assert router.route("resolver_problemas", "Demonstre o teorema de Stokes.").tier.name == "padrao"
+
+
+def test_latency_stats(router):
+    rapido = router.get_tier("rapido")
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        router.record_latency(rapido, seconds)
+    stats = router.latency_stats()
+    assert stats["rapido"]["count"] == 4
+    assert stats["rapido"]["p50"] == 0.2
+    assert stats["avancado"] == {"count": 0}
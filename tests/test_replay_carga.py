@@ -0,0 +1,115 @@
+import json
+import os
+import random
+import shutil
+import sys
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import replay_carga
+from utils.mock_watsonx import profile_for_model, start_mock_server
+
+
+def _record(question, timestamp=None, subject="calculo"):
+    return {"question": question, "subject": subject, "task_key": "elaborar_explicacao_tecnica", "timestamp": timestamp}
+
+
+def test_schedule_sorts_by_timestamp_and_shifts_repetitions():
+    records = [_record("c", 120.0), _record("a", 100.0), _record("b", 110.0)]
+    schedule = replay_carga.arrival_schedule(records, 2, rate=1.0, use_timestamps=True, speedup=2.0, rng=random.Random(0))
+
+    assert [r["question"] for r, _ in schedule] == ["a", "b", "c", "a", "b", "c"]
+    # duração do log (20s) + intervalo médio (10s) entre repetições, divididos pela aceleração
+    assert [offset for _, offset in schedule] == [0.0, 5.0, 10.0, 15.0, 20.0, 25.0]
+
+
+def test_schedule_falls_back_to_poisson_with_warning(capsys):
+    records = [_record("a", 100.0), _record("b")]
+    schedule = replay_carga.arrival_schedule(records, 1, rate=2.0, use_timestamps=True, speedup=1.0, rng=random.Random(0))
+
+    assert "sem 'timestamp'" in capsys.readouterr().out
+    offsets = [offset for _, offset in schedule]
+    assert offsets[0] == 0.0 and offsets == sorted(offsets)
+
+
+@pytest.mark.parametrize("model_id, profile", [
+    ("meta-llama/llama-3-1-8b-instruct", "small"),
+    ("meta-llama/llama-3-2-1b-instruct", "small"),
+    ("meta-llama/llama-3-2-11b-vision-instruct", "medium"),
+    ("mistralai/mixtral-8x7b-instruct-v01", "medium"),
+    ("meta-llama/llama-3-405b-instruct", "large"),
+    ("ibm/slate-125m-english-rtrvr", "embedding"),
+])
+def test_profile_for_model(model_id, profile):
+    assert profile_for_model(model_id) == profile
+
+
+def test_replay_against_mock_server(monkeypatch):
+    server, state = start_mock_server(latency_scale=0.01, seed=1)
+    try:
+        for key in ("WATSONX_API_BASE", "WATSONX_URL", "WATSONX_APIKEY", "WATSONX_PROJECT_ID", "WATSONX_TOKEN", "WATSONX_IAM_URL"):
+            monkeypatch.delenv(key, raising=False)
+        replay_carga.configure_mock_environment(f"http://127.0.0.1:{server.server_address[1]}")
+
+        # Alvo mínimo no lugar do AcademicCrew: uma chamada de chat ao watsonx configurado
+        def target(question, subject, task_key):
+            payload = json.dumps({
+                "model_id": "meta-llama/llama-3-1-8b-instruct",
+                "messages": [{"role": "user", "content": question}],
+                "max_tokens": 64,
+            }).encode("utf-8")
+            request = urllib.request.Request(
+                f"{os.environ['WATSONX_API_BASE']}/ml/v1/text/chat",
+                data=payload,
+                headers={"Content-Type": "application/json", "Authorization": f"Bearer {os.environ['WATSONX_TOKEN']}"},
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return json.load(response)["choices"][0]["message"]["content"]
+
+        records = [_record("defina limite"), _record("o que é derivada", subject="fisica")]
+        schedule = replay_carga.arrival_schedule(records, 3, rate=0, use_timestamps=False, speedup=1.0, rng=random.Random(0))
+        results, elapsed = replay_carga.replay(schedule, target, concurrency=4)
+    finally:
+        server.shutdown()
+
+    report = replay_carga.summarize(results, elapsed)
+    assert report["total"]["requests"] == 6
+    assert report["total"]["requests"] - report["total"]["errors"] > 0
+    assert set(report["subjects"]) == {"calculo", "fisica"}
+    assert state.requests == 6
+
+
+def test_assistente_runs_offline_against_mock(tmp_path, monkeypatch, make_pdf):
+    pytest.importorskip("crewai")
+    repo = Path(__file__).resolve().parent.parent
+    server, state = start_mock_server(latency_scale=0.01, seed=1)
+    try:
+        for key in ("WATSONX_API_BASE", "WATSONX_URL", "WATSONX_APIKEY", "WATSONX_PROJECT_ID",
+                    "WATSONX_TOKEN", "WATSONX_IAM_URL", "ACADEMIC_ASSISTANT_LOG_LEVEL"):
+            monkeypatch.delenv(key, raising=False)
+        replay_carga.configure_mock_environment(f"http://127.0.0.1:{server.server_address[1]}")
+        # Storage do CrewAI, telemetria e base de conhecimento isolados no diretório do teste
+        monkeypatch.setenv("HOME", str(tmp_path))
+        monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+        monkeypatch.setenv("CREWAI_STORAGE_DIR", "replay-test")
+        monkeypatch.setenv("CREWAI_DISABLE_TELEMETRY", "true")
+        monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+        monkeypatch.chdir(tmp_path)
+        shutil.copytree(repo / "config", tmp_path / "config")
+        make_pdf(tmp_path / "knowledge" / "calculo" / "notas.pdf", ["Limite de uma funcao " * 20])
+        # O LLM e o embedder leem o ambiente na importação
+        for module in ("main", "crew", "utils.watson_llm", "utils.document_processor", "utils.knowledge_sources"):
+            monkeypatch.delitem(sys.modules, module, raising=False)
+
+        target = replay_carga.build_target("assistente")
+        schedule = replay_carga.arrival_schedule(
+            [_record("defina limite")], 2, rate=0, use_timestamps=False, speedup=1.0, rng=random.Random(0)
+        )
+        responses = [target(r["question"], r["subject"], r["task_key"]) for r, _ in schedule]
+    finally:
+        server.shutdown()
+
+    assert not [r for r in responses if str(r).startswith(replay_carga.ERROR_PREFIX)]
+    assert state.requests > 0
@@ -1,8 +1,13 @@
 import os
 from pathlib import Path
-from typing import List, Dict
-from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
+from typing import List, Dict, Optional
+from crewai.knowledge.source.base_knowledge_source import BaseKnowledgeSource
 import yaml
+from utils.index_artifact import INDEX_DIRNAME, IndexArtifact, IndexArtifactError
+from utils.ingestion import DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_SIZE
+from utils.knowledge_sources import IndexArtifactKnowledgeSource, StreamingPDFKnowledgeSource
+from utils.metrics import CACHE_REQUESTS
+from utils.watson_llm import get_embed_model
 
 
 class DocumentProcessor:
@@ -37,7 +42,11 @@ class DocumentProcessor:
             return []
         
         # Lista todas as entradas no diretório e filtra apenas as que são pastas
-        subjects = [entry.name for entry in self.knowledge_base_path.iterdir() if entry.is_dir()]
+        # (pastas ocultas, como o índice global, não são matérias)
+        subjects = [
+            entry.name for entry in self.knowledge_base_path.iterdir()
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
         return subjects
 
     def get_subject_info(self, subject: str) -> Dict[str, str]:
@@ -74,16 +83,73 @@ class DocumentProcessor:
             "code": subject
         }
     
-    def get_knowledge_sources_for_subject(self, subject: str) -> List[PDFKnowledgeSource]:
+    def get_index_path(self, subject: str) -> Path:
+        """
+        Caminho do artefato de índice pré-construído de uma matéria.
+        O modo "geral" usa um índice único na raiz da base de conhecimento.
+        """
+        if subject == "geral":
+            return self.knowledge_base_path / INDEX_DIRNAME
+        return self.knowledge_base_path / subject / INDEX_DIRNAME
+
+    def get_pdf_paths(self, subject: str) -> List[Path]:
+        """PDFs que compõem a base de uma matéria (ou de todas, no modo "geral")."""
+        if subject == "geral":
+            return sorted(self.knowledge_base_path.rglob("*.pdf"))
+        return sorted((self.knowledge_base_path / subject).glob("*.pdf"))
+
+    def load_index_artifact(self, subject: str) -> Optional[IndexArtifact]:
+        """
+        Abre e valida o artefato de índice da matéria, se existir.
+
+        Returns:
+            O artefato pronto para uso, ou None se não houver artefato
+            ou se ele estiver desatualizado em relação aos PDFs/configuração.
+        """
+        index_path = self.get_index_path(subject)
+        if not index_path.is_dir():
+            return None
+        try:
+            artifact = IndexArtifact.open(index_path)
+            artifact.validate(
+                embed_model=get_embed_model(),
+                knowledge_base_path=self.knowledge_base_path,
+                pdf_paths=self.get_pdf_paths(subject),
+            )
+            return artifact
+        except IndexArtifactError as e:
+            print(f"Aviso: Índice pré-construído de '{subject}' ignorado: {e}")
+            return None
+
+    def _get_artifact_sources(self, subject: str) -> List[BaseKnowledgeSource]:
+        artifact = self.load_index_artifact(subject)
+        if artifact is None:
+            CACHE_REQUESTS.inc(cache="index_artifact", result="miss")
+            return []
+        # O hit é contado pela fonte, que só então sabe se os vetores puderam ser reaproveitados
+        print(
+            f"Usando índice pré-construído de '{subject}' "
+            f"({artifact.manifest.get('num_chunks')} chunks, {artifact.manifest.get('fingerprint')})."
+        )
+        chunking = artifact.manifest.get("chunking") or {}
+        return [IndexArtifactKnowledgeSource(
+            artifact=artifact,
+            chunk_size=chunking.get("chunk_size", DEFAULT_CHUNK_SIZE),
+            chunk_overlap=chunking.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP),
+        )]
+
+    def get_knowledge_sources_for_subject(self, subject: str) -> List[BaseKnowledgeSource]:
         """
         Encontra todos os arquivos PDF dentro da pasta de uma matéria específica
         e os carrega em uma fonte de conhecimento para o CrewAI.
+        Se houver um artefato de índice válido (gerado por `criar_materia.py build`),
+        ele é usado no lugar dos PDFs; senão os PDFs são ingeridos em streaming.
         
         Args:
             subject: O nome da matéria (que deve corresponder a uma subpasta).
         
         Returns:
-            Uma lista contendo um objeto PDFKnowledgeSource com os documentos da matéria.
+            Uma lista contendo uma fonte de conhecimento com os documentos da matéria.
         """
         subject_path = self.knowledge_base_path / subject
         
@@ -91,8 +157,12 @@ class DocumentProcessor:
             print(f"Aviso: A pasta da matéria '{subject}' não foi encontrada em '{self.knowledge_base_path}'.")
             return []
 
+        artifact_sources = self._get_artifact_sources(subject)
+        if artifact_sources:
+            return artifact_sources
+
         # Encontra todos os arquivos PDF diretamente na pasta da matéria
-        pdf_path_objects = list(subject_path.glob("*.pdf"))
+        pdf_path_objects = self.get_pdf_paths(subject)
 
         if not pdf_path_objects:
             print(f"Aviso: Nenhum arquivo PDF foi encontrado na pasta '{subject}'.")
@@ -103,24 +173,29 @@ class DocumentProcessor:
 
             print(f"Carregando {len(relative_paths)} documento(s) da matéria '{subject}': {relative_paths}")
 
-            knowledge_source = PDFKnowledgeSource(
-                file_paths=relative_paths,
-                knowledge_base_directory=str(self.knowledge_base_path)
+            knowledge_source = StreamingPDFKnowledgeSource(
+                file_paths=pdf_path_objects,
+                knowledge_base_path=self.knowledge_base_path
             )
             return [knowledge_source]
         except Exception as e:
             print(f"Erro ao criar a fonte de conhecimento para a matéria '{subject}': {e}")
             return []
     
-    def get_all_knowledge_sources(self) -> List[PDFKnowledgeSource]:
+    def get_all_knowledge_sources(self) -> List[BaseKnowledgeSource]:
         """
-        Cria uma fonte de conhecimento contendo TODOS os PDFs de TODAS as matérias.
+        Cria uma fonte de conhecimento contendo TODOS os PDFs de TODAS as matérias,
+        preferindo o índice global pré-construído quando disponível.
         
         Returns:
-            Uma lista contendo um único objeto PDFKnowledgeSource com todos os documentos.
+            Uma lista contendo uma única fonte de conhecimento com todos os documentos.
         """
-        # Usa rglob para buscar recursivamente em todas as subpastas
-        all_pdf_path_objects = list(self.knowledge_base_path.rglob("*.pdf"))
+        artifact_sources = self._get_artifact_sources("geral")
+        if artifact_sources:
+            return artifact_sources
+
+        # Busca recursivamente em todas as subpastas
+        all_pdf_path_objects = self.get_pdf_paths("geral")
         
         if not all_pdf_path_objects:
             print("Aviso: Nenhum arquivo PDF foi encontrado em nenhuma das pastas de matérias.")
@@ -131,9 +206,9 @@ class DocumentProcessor:
 
             print(f"Carregando um total de {len(relative_paths)} documento(s) de todas as matérias.")
             
-            knowledge_source = PDFKnowledgeSource(
-                file_paths=relative_paths,
-                knowledge_base_directory=str(self.knowledge_base_path)
+            knowledge_source = StreamingPDFKnowledgeSource(
+                file_paths=all_pdf_path_objects,
+                knowledge_base_path=self.knowledge_base_path
             )
             return [knowledge_source]
         except Exception as e:
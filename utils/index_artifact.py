@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+from utils.ingestion import IngestionConfig, IngestionProgress, IngestionSink, ingest
+
+
+# Versão do formato em disco. Incrementar sempre que o layout dos arquivos mudar,
+# para que artefatos antigos sejam rejeitados em vez de lidos incorretamente.
+FORMAT_VERSION = 1
+
+INDEX_DIRNAME = ".index"
+# Arquivo dentro de INDEX_DIRNAME com o nome da versão publicada (subdiretório v<ns>)
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.yaml"
+DOCUMENTS_FILE = "documents.jsonl"
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDINGS_PART_FILE = "embeddings.f32.part"
+
+
+class IndexArtifactError(Exception):
+    """Artefato de índice ausente, corrompido ou incompatível com a configuração atual."""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def describe_source(pdf_path: Path, knowledge_base_path: Path) -> Dict[str, Any]:
+    stat = pdf_path.stat()
+    return {
+        "path": str(pdf_path.relative_to(knowledge_base_path)),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(pdf_path),
+    }
+
+
+def artifact_fingerprint(sources: List[Dict[str, Any]], embed_model: str, chunk_size: int, chunk_overlap: int) -> str:
+    """Identificador do conteúdo do artefato: muda sempre que fontes, modelo ou chunking mudarem."""
+    digest = hashlib.sha256()
+    digest.update(f"{FORMAT_VERSION}|{embed_model}|{chunk_size}|{chunk_overlap}".encode("utf-8"))
+    for source in sources:
+        digest.update(f"|{source['path']}:{source['sha256']}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class IndexArtifactWriter(IngestionSink):
+    """
+    Sink da ingestão que grava o artefato incrementalmente em um diretório
+    temporário: páginas e chunks vão para JSONL e os vetores para um arquivo
+    binário bruto, convertido em `.npy` no `finalize`. Só o lote corrente
+    fica em memória.
+
+    Layout em disco: `output_dir/v<ns>/` guarda cada versão gerada e
+    `output_dir/CURRENT` aponta para a versão publicada.
+    """
+
+    def __init__(self, output_dir: Path, knowledge_base_path: Path):
+        self.output_dir = Path(output_dir)
+        self.knowledge_base_path = Path(knowledge_base_path)
+        self.version = f"v{time.time_ns()}"
+        self.tmp_dir = self.output_dir / f".tmp-{self.version}"
+        self.tmp_dir.mkdir(parents=True)
+
+        self.sources: List[Dict[str, Any]] = []
+        self.num_documents = 0
+        self.num_chunks = 0
+        self.embedding_dim: Optional[int] = None
+        self._documents = open(self.tmp_dir / DOCUMENTS_FILE, "w", encoding="utf-8")
+        self._chunks = open(self.tmp_dir / CHUNKS_FILE, "w", encoding="utf-8")
+        self._vectors = open(self.tmp_dir / EMBEDDINGS_PART_FILE, "wb")
+
+    def add_source(self, pdf_path: Path) -> None:
+        self.sources.append(describe_source(Path(pdf_path), self.knowledge_base_path))
+
+    def write_document(self, source: str, page: int, text: str) -> None:
+        self._documents.write(json.dumps({"source": source, "page": page, "text": text}, ensure_ascii=False))
+        self._documents.write("\n")
+        self.num_documents += 1
+
+    def write_batch(self, chunks: List[Dict], vectors: Optional[List[List[float]]]) -> None:
+        if vectors is None or len(vectors) != len(chunks):
+            raise IndexArtifactError("O artefato exige um embedding por chunk.")
+        array = np.asarray(vectors, dtype=np.float32)
+        if self.embedding_dim is None:
+            self.embedding_dim = int(array.shape[1])
+        elif array.shape[1] != self.embedding_dim:
+            raise IndexArtifactError(f"Dimensão de embedding variou de {self.embedding_dim} para {array.shape[1]}.")
+        for chunk in chunks:
+            self._chunks.write(json.dumps(chunk, ensure_ascii=False))
+            self._chunks.write("\n")
+        self._vectors.write(array.tobytes())
+        self.num_chunks += len(chunks)
+
+    def _close_files(self) -> None:
+        for f in (self._documents, self._chunks, self._vectors):
+            f.close()
+
+    def abort(self) -> None:
+        self._close_files()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def finalize(self, embed_model: str, subject: str, chunk_size: int, chunk_overlap: int) -> Path:
+        """
+        Converte os vetores para `.npy`, escreve o manifest e publica a nova versão
+        trocando o ponteiro `CURRENT` com um único rename atômico: leitores
+        concorrentes veem sempre a versão anterior ou a nova, nunca um índice
+        ausente ou pela metade. A versão anterior é mantida para requisições
+        que já a abriram; versões mais antigas e temporários de builds
+        anteriores interrompidos são removidos (builds concorrentes mais
+        recentes não são tocados).
+        """
+        self._close_files()
+        if not self.num_chunks:
+            shutil.rmtree(self.tmp_dir)
+            raise IndexArtifactError("Nenhum texto extraído dos PDFs; o artefato ficaria vazio.")
+
+        part_path = self.tmp_dir / EMBEDDINGS_PART_FILE
+        header = {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            "fortran_order": False,
+            "shape": (self.num_chunks, self.embedding_dim),
+        }
+        with open(self.tmp_dir / EMBEDDINGS_FILE, "wb") as out, open(part_path, "rb") as part:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(part, out, length=1024 * 1024)
+        part_path.unlink()
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "subject": subject,
+            "fingerprint": artifact_fingerprint(self.sources, embed_model, chunk_size, chunk_overlap),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "embed_model": embed_model,
+            "embedding_dim": self.embedding_dim,
+            "chunking": {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap},
+            "num_documents": self.num_documents,
+            "num_chunks": self.num_chunks,
+            "sources": self.sources,
+        }
+        with open(self.tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            yaml.safe_dump(manifest, f, sort_keys=False, allow_unicode=True)
+
+        previous = read_current_version(self.output_dir)
+        os.replace(self.tmp_dir, self.output_dir / self.version)
+        pointer_tmp = self.output_dir / f".{CURRENT_FILE}.{self.version}"
+        pointer_tmp.write_text(self.version + "\n", encoding="utf-8")
+        os.replace(pointer_tmp, self.output_dir / CURRENT_FILE)
+
+        keep = {self.version, previous}
+        for entry in self.output_dir.iterdir():
+            if entry.is_dir() and entry.name.startswith("v") and entry.name not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+            elif _is_stale_build(entry.name, self.version):
+                # Sobras de builds mortos por OOM/SIGKILL, que não passam pelo abort()
+                if entry.is_dir():
+                    shutil.rmtree(entry, ignore_errors=True)
+                else:
+                    entry.unlink(missing_ok=True)
+        return self.output_dir
+
+
+def _is_stale_build(name: str, version: str) -> bool:
+    """Diretório `.tmp-v<ns>` ou ponteiro `.CURRENT.v<ns>` de um build iniciado antes de `version`."""
+    for prefix in (".tmp-", f".{CURRENT_FILE}."):
+        if name.startswith(prefix):
+            started = name[len(prefix):]
+            return started[1:].isdigit() and started.startswith("v") and int(started[1:]) < int(version[1:])
+    return False
+
+
+def build_index_artifact(
+    pdf_paths: List[Path],
+    knowledge_base_path: Path,
+    output_dir: Path,
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    embed_model: str,
+    subject: str,
+    config: Optional[IngestionConfig] = None,
+    on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+) -> Path:
+    """
+    Gera um artefato de índice autocontido para um conjunto de PDFs.
+
+    O artefato contém o texto extraído por página, os chunks, os embeddings
+    e um manifest com o modelo de embedding e a configuração de chunking.
+    A ingestão é feita em streaming (ver `utils.ingestion.ingest`), então
+    o consumo de memória não depende do tamanho do corpus.
+
+    Args:
+        pdf_paths: PDFs a indexar.
+        knowledge_base_path: Raiz da base de conhecimento (os caminhos no manifest são relativos a ela).
+        output_dir: Diretório do índice (recebe a nova versão e o ponteiro `CURRENT`).
+        embed_fn: Função que recebe uma lista de textos e devolve seus vetores.
+        embed_model: Identificador do modelo de embedding usado por `embed_fn`.
+        subject: Código da matéria (ou "geral").
+        config: Chunking e limites de lote/memória (default: lidos do ambiente).
+        on_progress: Callback de progresso repassado a `ingest`.
+
+    Returns:
+        O caminho do artefato gerado.
+    """
+    config = config or IngestionConfig()
+    writer = IndexArtifactWriter(output_dir, knowledge_base_path)
+    try:
+        ingest(
+            sorted(pdf_paths),
+            knowledge_base_path,
+            sink=writer,
+            embed_fn=embed_fn,
+            config=config,
+            on_progress=on_progress,
+            on_source=writer.add_source,
+        )
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.finalize(embed_model, subject, config.chunk_size, config.chunk_overlap)
+
+
+def read_current_version(index_dir: Path) -> Optional[str]:
+    """Nome da versão publicada em `index_dir`, ou None se ainda não há nenhuma."""
+    try:
+        return (Path(index_dir) / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# Resultado de validações já feitas neste processo (None = válido, str = motivo da falha),
+# indexado pela versão do artefato e pelo estado (size, mtime_ns) das fontes locais.
+_validation_cache: Dict[Tuple, Optional[str]] = {}
+_validation_lock = threading.Lock()
+
+
+class IndexArtifact:
+    """
+    Artefato de índice já construído, aberto de forma barata.
+
+    A abertura lê o ponteiro `CURRENT` e o manifest da versão publicada e mapeia
+    os embeddings em memória (mmap); os chunks são lidos do disco sob demanda,
+    em streaming.
+    """
+
+    def __init__(self, path: Path, manifest: Dict[str, Any], embeddings: np.ndarray):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.embeddings = embeddings
+
+    @classmethod
+    def open(cls, index_dir: Path) -> "IndexArtifact":
+        version = read_current_version(index_dir)
+        if version is None:
+            raise IndexArtifactError(f"Nenhuma versão publicada em '{index_dir}'.")
+        path = Path(index_dir) / version
+        manifest_path = path / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise IndexArtifactError(f"Manifest não encontrado em '{path}'.")
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = yaml.safe_load(f) or {}
+            embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode="r")
+        except Exception as e:
+            raise IndexArtifactError(f"Artefato em '{path}' não pôde ser aberto: {e}") from e
+        return cls(path, manifest, embeddings)
+
+    def iter_chunks(self) -> Iterator[str]:
+        for row in _iter_jsonl(self.path / CHUNKS_FILE):
+            yield row["text"]
+
+    @property
+    def embed_model(self) -> str:
+        return self.manifest.get("embed_model", "")
+
+    def validate(
+        self,
+        embed_model: str,
+        knowledge_base_path: Optional[Path] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        pdf_paths: Optional[List[Path]] = None,
+    ) -> None:
+        """
+        Confere o artefato contra o manifest e a configuração atual.
+
+        Fontes ausentes localmente são aceitas (o artefato é autocontido e pode
+        ser distribuído sem os PDFs); fontes presentes precisam coincidir com o
+        que foi indexado, e PDFs em `pdf_paths` fora do manifest invalidam o artefato.
+
+        O resultado fica em cache no processo enquanto a versão do artefato e o
+        (size, mtime_ns) das fontes locais não mudarem, então o hash completo de
+        um PDF copiado para outra máquina é calculado uma única vez.
+
+        Raises:
+            IndexArtifactError: se qualquer verificação falhar.
+        """
+        cache_key = self._validation_key(embed_model, knowledge_base_path, chunk_size, chunk_overlap, pdf_paths)
+        with _validation_lock:
+            cached = _validation_cache.get(cache_key, False)
+        if cached is not False:
+            if cached is not None:
+                raise IndexArtifactError(cached)
+            return
+
+        try:
+            self._validate(embed_model, knowledge_base_path, chunk_size, chunk_overlap, pdf_paths)
+        except IndexArtifactError as e:
+            with _validation_lock:
+                _validation_cache[cache_key] = str(e)
+            raise
+        with _validation_lock:
+            _validation_cache[cache_key] = None
+
+    def _validation_key(
+        self,
+        embed_model: str,
+        knowledge_base_path: Optional[Path],
+        chunk_size: Optional[int],
+        chunk_overlap: Optional[int],
+        pdf_paths: Optional[List[Path]],
+    ) -> Tuple:
+        local_stats = []
+        if knowledge_base_path is not None:
+            for source in self.manifest.get("sources", []):
+                try:
+                    stat = (Path(knowledge_base_path) / source["path"]).stat()
+                    local_stats.append((source["path"], stat.st_size, stat.st_mtime_ns))
+                except FileNotFoundError:
+                    local_stats.append((source["path"], None, None))
+        return (
+            str(self.path.resolve()),
+            embed_model,
+            str(knowledge_base_path),
+            chunk_size,
+            chunk_overlap,
+            tuple(sorted(str(p) for p in pdf_paths or [])),
+            tuple(local_stats),
+        )
+
+    def _validate(
+        self,
+        embed_model: str,
+        knowledge_base_path: Optional[Path],
+        chunk_size: Optional[int],
+        chunk_overlap: Optional[int],
+        pdf_paths: Optional[List[Path]],
+    ) -> None:
+        manifest = self.manifest
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise IndexArtifactError(
+                f"Versão de formato {manifest.get('format_version')} incompatível (esperada {FORMAT_VERSION})."
+            )
+        if manifest.get("embed_model") != embed_model:
+            raise IndexArtifactError(
+                f"Artefato gerado com o modelo '{manifest.get('embed_model')}', mas o configurado é '{embed_model}'."
+            )
+        chunking = manifest.get("chunking") or {}
+        if chunk_size is not None and chunking.get("chunk_size") != chunk_size:
+            raise IndexArtifactError(f"chunk_size do artefato ({chunking.get('chunk_size')}) difere do configurado ({chunk_size}).")
+        if chunk_overlap is not None and chunking.get("chunk_overlap") != chunk_overlap:
+            raise IndexArtifactError(f"chunk_overlap do artefato ({chunking.get('chunk_overlap')}) difere do configurado ({chunk_overlap}).")
+
+        expected_shape = (manifest.get("num_chunks"), manifest.get("embedding_dim"))
+        if tuple(self.embeddings.shape) != expected_shape:
+            raise IndexArtifactError(
+                f"Embeddings com formato {tuple(self.embeddings.shape)}, manifest declara {expected_shape}."
+            )
+
+        if knowledge_base_path is None:
+            return
+        knowledge_base_path = Path(knowledge_base_path)
+        indexed = {source["path"] for source in manifest.get("sources", [])}
+        for pdf_path in pdf_paths or []:
+            rel = str(Path(pdf_path).relative_to(knowledge_base_path))
+            if rel not in indexed:
+                raise IndexArtifactError(f"PDF '{rel}' não está no artefato; gere o índice novamente.")
+        for source in manifest.get("sources", []):
+            local_path = knowledge_base_path / source["path"]
+            if not local_path.exists():
+                continue
+            stat = local_path.stat()
+            if stat.st_size != source.get("size"):
+                raise IndexArtifactError(f"Fonte '{source['path']}' mudou desde a geração do artefato.")
+            # mtime costuma mudar ao copiar arquivos entre máquinas; só então compara o conteúdo
+            if stat.st_mtime_ns != source.get("mtime_ns") and file_sha256(local_path) != source.get("sha256"):
+                raise IndexArtifactError(f"Fonte '{source['path']}' mudou desde a geração do artefato.")
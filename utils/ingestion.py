@@ -0,0 +1,268 @@
+import gc
+import os
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+
+# Mesmos valores padrão usados pelas fontes de conhecimento do CrewAI
+DEFAULT_CHUNK_SIZE = 4000
+DEFAULT_CHUNK_OVERLAP = 200
+DEFAULT_EMBED_BATCH_SIZE = 32
+
+
+def chunk_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[str]:
+    """
+    Divide o texto em pedaços de tamanho fixo com sobreposição, replicando
+    a estratégia de chunking do CrewAI.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap deve ser menor que chunk_size.")
+    step = chunk_size - chunk_overlap
+    return [text[i:i + chunk_size] for i in range(0, len(text), step)]
+
+
+class IngestionConfig:
+    """
+    Limites da ingestão. Variáveis de ambiente opcionais:
+      - INGEST_BATCH_SIZE (default: 32 chunks por lote)
+      - INGEST_MAX_BATCH_MB (default: 8 MB de texto por lote)
+      - INGEST_MEMORY_LIMIT_MB (default: 0, sem teto de memória)
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        max_batch_mb: Optional[float] = None,
+        memory_limit_mb: Optional[float] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+    ):
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", DEFAULT_EMBED_BATCH_SIZE))
+        self.max_batch_mb = max_batch_mb or float(os.getenv("INGEST_MAX_BATCH_MB", 8))
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else float(os.getenv("INGEST_MEMORY_LIMIT_MB", 0))
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap deve ser menor que chunk_size.")
+
+
+class IngestionProgress:
+    """Contadores acumulados da ingestão, repassados ao callback de progresso."""
+
+    def __init__(self, total_files: int):
+        self.total_files = total_files
+        self.files_done = 0
+        self.current_file = ""
+        self.pages = 0
+        self.chunks = 0
+        self.batches = 0
+        self.text_bytes = 0
+        self.rss_mb = 0.0
+        self.started_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+
+class ProgressPrinter:
+    """Reporta o progresso no stderr, no máximo a cada `interval` segundos e ao fim de cada arquivo."""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self._last_print = 0.0
+        self._last_files_done = -1
+
+    def __call__(self, progress: IngestionProgress) -> None:
+        now = time.perf_counter()
+        file_finished = progress.files_done != self._last_files_done
+        if not file_finished and now - self._last_print < self.interval:
+            return
+        self._last_print = now
+        self._last_files_done = progress.files_done
+        print(
+            f"[*] {progress.files_done}/{progress.total_files} arquivo(s) | {progress.pages} páginas | "
+            f"{progress.chunks} chunks | {progress.text_bytes / 2**20:.1f} MB de texto | "
+            f"RSS {progress.rss_mb:.0f} MB | {progress.elapsed:.1f}s | {progress.current_file}",
+            file=sys.stderr,
+        )
+
+
+def current_rss_mb() -> float:
+    """Memória residente atual do processo (pico, onde /proc não está disponível)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss vem em bytes no macOS e em KB no Linux
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class MemoryGuard:
+    """
+    Teto de memória adaptativo: quando o RSS passa do limite, o orçamento
+    de cada lote é reduzido pela metade (até 1 chunk) e o lote atual é
+    descarregado imediatamente. O RSS é amostrado no máximo a cada
+    `check_interval` segundos para não pesar no laço de chunking.
+
+    O teto limita o que se acumula nos lotes (chunks e vetores); a memória
+    usada pelo leitor de um PDF grande não encolhe com ele.
+    """
+
+    def __init__(self, config: IngestionConfig, check_interval: float = 0.25):
+        self.limit_mb = config.memory_limit_mb
+        self.batch_size = config.batch_size
+        self.max_batch_bytes = int(config.max_batch_mb * 2**20)
+        self.check_interval = check_interval
+        self._last_check = 0.0
+        self._warned = False
+
+    def over_limit(self) -> bool:
+        if not self.limit_mb:
+            return False
+        now = time.perf_counter()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        if current_rss_mb() <= self.limit_mb:
+            return False
+        gc.collect()
+        if current_rss_mb() <= self.limit_mb:
+            return False
+        self.batch_size = max(1, self.batch_size // 2)
+        self.max_batch_bytes = max(1, self.max_batch_bytes // 2)
+        if self.batch_size == 1 and not self._warned:
+            self._warned = True
+            print(
+                f"Aviso: RSS acima de {self.limit_mb:.0f} MB mesmo com lotes de 1 chunk; "
+                "a ingestão continua, mas o limite pode ser baixo demais.",
+                file=sys.stderr,
+            )
+        return True
+
+
+def iter_pdf_pages(pdf_path: Path) -> Iterator[Tuple[int, str]]:
+    """
+    Gera (número da página, texto) de um PDF, uma página por vez.
+
+    O arquivo é lido do disco sob demanda (passar o caminho ao PdfReader copiaria
+    o PDF inteiro para memória), mas o PyPDF2 ainda guarda em cache os objetos já
+    lidos: a memória de um único PDF cresce com as páginas percorridas e não é
+    controlada pelo MemoryGuard.
+    """
+    with open(pdf_path, "rb") as f:
+        reader = PdfReader(f)
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield page_number, page.extract_text() or ""
+
+
+def iter_text_chunks(pages: Iterable[str], chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    """
+    Versão em streaming de `chunk_text("\\n".join(pages))`: produz exatamente os
+    mesmos chunks, mas mantém em memória só a página atual e o resto do chunk anterior.
+    """
+    step = chunk_size - chunk_overlap
+    buffer = ""
+    first = True
+    for page_text in pages:
+        buffer += page_text if first else "\n" + page_text
+        first = False
+        while len(buffer) >= chunk_size:
+            yield buffer[:chunk_size]
+            buffer = buffer[step:]
+    for i in range(0, len(buffer), step):
+        yield buffer[i:i + chunk_size]
+
+
+class IngestionSink:
+    """Destino dos dados ingeridos. Subclasses decidem onde persistir cada lote."""
+
+    def write_document(self, source: str, page: int, text: str) -> None:
+        pass
+
+    def write_batch(self, chunks: List[Dict], vectors: Optional[List[List[float]]]) -> None:
+        raise NotImplementedError
+
+
+def ingest(
+    pdf_paths: List[Path],
+    knowledge_base_path: Path,
+    sink: IngestionSink,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    config: Optional[IngestionConfig] = None,
+    on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+    on_source: Optional[Callable[[Path], None]] = None,
+) -> IngestionProgress:
+    """
+    Pipeline de ingestão em streaming: lê páginas, extrai texto, gera chunks,
+    calcula embeddings e persiste em lotes limitados por quantidade, por bytes
+    e pelo teto de memória. Nunca mantém um documento inteiro em memória.
+
+    Args:
+        pdf_paths: PDFs a ingerir, na ordem de processamento.
+        knowledge_base_path: Raiz da base (os caminhos das fontes são relativos a ela).
+        sink: Destino de páginas e lotes de chunks.
+        embed_fn: Função de embedding por lote. Se None, o sink recebe vectors=None.
+        config: Limites de lote e memória (default: lidos do ambiente).
+        on_progress: Chamado após cada lote e ao fim de cada arquivo (default: ProgressPrinter).
+        on_source: Chamado antes de processar cada arquivo.
+
+    Returns:
+        Os contadores finais da ingestão.
+    """
+    config = config or IngestionConfig()
+    on_progress = on_progress or ProgressPrinter()
+    knowledge_base_path = Path(knowledge_base_path)
+    guard = MemoryGuard(config)
+    progress = IngestionProgress(len(pdf_paths))
+
+    batch: List[Dict] = []
+    batch_bytes = 0
+
+    def flush():
+        nonlocal batch, batch_bytes
+        if not batch:
+            return
+        vectors = embed_fn([c["text"] for c in batch]) if embed_fn else None
+        sink.write_batch(batch, vectors)
+        progress.batches += 1
+        batch, batch_bytes = [], 0
+        progress.rss_mb = current_rss_mb()
+        on_progress(progress)
+
+    for pdf_path in pdf_paths:
+        if on_source:
+            on_source(pdf_path)
+        source = str(Path(pdf_path).relative_to(knowledge_base_path))
+        progress.current_file = source
+
+        def pages():
+            for page_number, page_text in iter_pdf_pages(pdf_path):
+                progress.pages += 1
+                progress.text_bytes += len(page_text.encode("utf-8"))
+                sink.write_document(source, page_number, page_text)
+                yield page_text
+
+        for chunk_index, chunk in enumerate(iter_text_chunks(pages(), config.chunk_size, config.chunk_overlap)):
+            batch.append({"source": source, "index": chunk_index, "text": chunk})
+            batch_bytes += len(chunk.encode("utf-8"))
+            progress.chunks += 1
+            if len(batch) >= guard.batch_size or batch_bytes >= guard.max_batch_bytes or guard.over_limit():
+                flush()
+
+        progress.files_done += 1
+        # Fecha o lote no fim de cada arquivo para que nada de um PDF espere pelo próximo
+        if batch:
+            flush()
+        else:
+            progress.rss_mb = current_rss_mb()
+            on_progress(progress)
+
+    return progress
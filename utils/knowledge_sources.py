@@ -0,0 +1,174 @@
+import hashlib
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from crewai.knowledge.source.base_knowledge_source import BaseKnowledgeSource
+from pydantic import Field, PrivateAttr
+
+from utils.index_artifact import IndexArtifact
+from utils.ingestion import IngestionConfig, IngestionSink, ingest
+from utils.metrics import CACHE_REQUESTS
+
+# Avisa uma única vez por processo quando o storage do CrewAI não expõe a coleção
+_warned_no_collection = False
+
+# Metadado gravado no último chunk de um artefato carregado por completo na coleção
+ARTIFACT_MARKER_KEY = "index_artifact_fingerprint"
+
+
+def _storage_key(storage) -> str:
+    # Crews diferentes criam storages novos apontando para a mesma coleção persistida
+    return getattr(storage, "collection_name", None) or f"storage-{id(storage)}"
+
+
+class _StorageSink(IngestionSink):
+    """Sink que grava cada lote de chunks direto no KnowledgeStorage do CrewAI."""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def write_batch(self, chunks: List[Dict], vectors: Optional[List[List[float]]]) -> None:
+        # O storage calcula os embeddings com o embedder configurado no Crew
+        self.storage.save([c["text"] for c in chunks])
+
+
+class StreamingPDFKnowledgeSource(BaseKnowledgeSource):
+    """
+    Fonte de conhecimento de PDFs com ingestão em streaming.
+
+    Substitui o PDFKnowledgeSource, que carrega o texto de todos os PDFs de uma
+    vez: aqui as páginas são lidas, divididas em chunks e enviadas ao storage
+    em lotes limitados (ver `utils.ingestion`), então o pico de memória não
+    cresce com o tamanho do corpus.
+    """
+
+    file_paths: List[Path] = Field(description="Caminhos absolutos ou relativos ao cwd dos PDFs")
+    knowledge_base_path: Path = Field(description="Raiz da base de conhecimento")
+    ingestion_config: Optional[Any] = Field(default=None, description="IngestionConfig opcional")
+
+    _ingested_into: set = PrivateAttr(default_factory=set)
+
+    def validate_content(self) -> Any:
+        missing = [str(p) for p in self.file_paths if not Path(p).is_file()]
+        if missing:
+            raise FileNotFoundError(f"PDFs não encontrados: {missing}")
+        return self.file_paths
+
+    def add(self) -> None:
+        if not self.storage:
+            raise ValueError("No storage found to save documents.")
+        key = _storage_key(self.storage)
+        if key in self._ingested_into:
+            return
+        config = self.ingestion_config or IngestionConfig(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+        )
+        ingest(
+            [Path(p) for p in self.file_paths],
+            self.knowledge_base_path,
+            sink=_StorageSink(self.storage),
+            config=config,
+            # No caminho da requisição o progresso não é exibido (o ProgressPrinter é do build)
+            on_progress=lambda progress: None,
+        )
+        self._ingested_into.add(key)
+
+
+class IndexArtifactKnowledgeSource(BaseKnowledgeSource):
+    """
+    Fonte de conhecimento alimentada por um artefato de índice pré-construído.
+
+    Os chunks e embeddings já vêm prontos do artefato, então nenhuma extração
+    de PDF ou chamada ao embedder acontece no caminho da requisição: os vetores
+    são gravados diretamente na coleção do CrewAI, em lotes lidos do disco.
+
+    Depois da carga completa, o último chunk recebe o fingerprint do manifest como
+    metadado (`ARTIFACT_MARKER_KEY`). Requisições seguintes, mesmo em crews novos,
+    só consultam esse marcador e retornam sem ler os chunks; a varredura e o upsert
+    acontecem apenas quando a versão do artefato ainda não está na coleção.
+
+    Isso depende do KnowledgeStorage expor a coleção do Chroma (`storage.collection`).
+    Se a versão do CrewAI não expuser, os chunks são re-embedados pelo storage,
+    com aviso e contabilizados como miss do cache `index_artifact`.
+    """
+
+    artifact: IndexArtifact = Field(description="IndexArtifact já aberto e validado")
+    upsert_batch_size: int = Field(default=256)
+
+    _ingested_into: set = PrivateAttr(default_factory=set)
+
+    def validate_content(self) -> Any:
+        return self.artifact
+
+    def add(self) -> None:
+        global _warned_no_collection
+        if not self.storage:
+            raise ValueError("No storage found to save documents.")
+        key = _storage_key(self.storage)
+        if key in self._ingested_into:
+            return
+        collection = getattr(self.storage, "collection", None)
+        if collection is None:
+            CACHE_REQUESTS.inc(cache="index_artifact", result="miss")
+            if not _warned_no_collection:
+                _warned_no_collection = True
+                print(
+                    "Aviso: o KnowledgeStorage desta versão do CrewAI não expõe a coleção; "
+                    "os embeddings do índice pré-construído serão ignorados e os chunks re-embedados.",
+                    file=sys.stderr,
+                )
+        else:
+            CACHE_REQUESTS.inc(cache="index_artifact", result="hit")
+            if self._artifact_loaded(collection):
+                CACHE_REQUESTS.inc(cache="knowledge_collection", result="hit")
+                self._ingested_into.add(key)
+                return
+            CACHE_REQUESTS.inc(cache="knowledge_collection", result="miss")
+
+        embeddings = self.artifact.embeddings
+        chunks = self.artifact.iter_chunks()
+        start = 0
+        last = None
+        while True:
+            batch = list(islice(chunks, self.upsert_batch_size))
+            if not batch:
+                break
+            if collection is None:
+                self.storage.save(batch)
+                start += len(batch)
+                continue
+
+            # Mesmo esquema de ids do KnowledgeStorage, para não duplicar documentos
+            ids = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in batch]
+            existing = set(collection.get(ids=ids, include=[])["ids"])
+            missing = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+            if missing:
+                collection.upsert(
+                    ids=[ids[i] for i in missing],
+                    documents=[batch[i] for i in missing],
+                    embeddings=[embeddings[start + i].tolist() for i in missing],
+                )
+            last = (ids[-1], batch[-1], start + len(batch) - 1)
+            start += len(batch)
+
+        fingerprint = self.artifact.manifest.get("fingerprint")
+        if collection is not None and last is not None and fingerprint:
+            # Gravado só depois de todos os lotes: uma carga interrompida não deixa marcador
+            doc_id, chunk, index = last
+            collection.upsert(
+                ids=[doc_id],
+                documents=[chunk],
+                embeddings=[embeddings[index].tolist()],
+                metadatas=[{ARTIFACT_MARKER_KEY: fingerprint}],
+            )
+        self._ingested_into.add(key)
+
+    def _artifact_loaded(self, collection) -> bool:
+        fingerprint = self.artifact.manifest.get("fingerprint")
+        if not fingerprint:
+            return False
+        found = collection.get(where={ARTIFACT_MARKER_KEY: fingerprint}, limit=1, include=[])
+        return bool(found["ids"])
@@ -0,0 +1,246 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Buckets em segundos: de respostas rápidas do modelo pequeno até kickoffs longos com ingestão
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Contador monotônico com labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = super().render()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; cada observação custa uma busca binária e um lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # por série: [contagens por bucket (não cumulativas) + overflow, soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*s[0]], s[1], s[2])) for key, s in self._series.items())
+        lines = super().render()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica '{metric.name}' já registrada.")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def render_prometheus(self) -> str:
+        """Todas as métricas no formato texto de exposição do Prometheus (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "academic_request_duration_seconds",
+    "Duração de AcademicCrew.run por matéria e tarefa.",
+    ("subject", "task_key"),
+)
+REQUESTS = REGISTRY.counter(
+    "academic_requests_total",
+    "Requisições por matéria, tarefa e status (ok/error).",
+    ("subject", "task_key", "status"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "academic_llm_tokens_total",
+    "Tokens consumidos por matéria, tarefa, camada de modelo e tipo (prompt/completion).",
+    ("subject", "task_key", "tier", "kind"),
+)
+MODEL_TIER_DURATION = REGISTRY.histogram(
+    "academic_model_tier_duration_seconds",
+    "Duração de cada kickoff por camada de modelo.",
+    ("tier",),
+)
+MODEL_ESCALATIONS = REGISTRY.counter(
+    "academic_model_escalations_total",
+    "Respostas refeitas na camada seguinte, pela camada de origem.",
+    ("tier",),
+)
+KNOWLEDGE_LOAD_DURATION = REGISTRY.histogram(
+    "academic_knowledge_load_duration_seconds",
+    "Tempo para montar as fontes de conhecimento do crew, por matéria e origem (index/pdf/none).",
+    ("subject", "source"),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "academic_cache_requests_total",
+    "Consultas a caches por nome do cache e resultado (hit/miss).",
+    ("cache", "result"),
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes periódicos não devem poluir o log da aplicação
+        pass
+
+
+def write_metrics_file(path: str) -> None:
+    """Grava as métricas com rename atômico (compatível com o textfile collector do node_exporter)."""
+    target = Path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.write_text(REGISTRY.render_prometheus(), encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def _flush_loop(path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_file(path)
+        except OSError as e:
+            print(f"Aviso: falha ao gravar métricas em '{path}': {e}", file=sys.stderr)
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def start_metrics_exporter() -> None:
+    """
+    Inicia a exportação das métricas, uma única vez por processo.
+    Variáveis de ambiente opcionais:
+      - ACADEMIC_ASSISTANT_METRICS_PORT (servidor HTTP com GET /metrics)
+      - ACADEMIC_ASSISTANT_METRICS_FILE (arquivo regravado periodicamente)
+      - ACADEMIC_ASSISTANT_METRICS_FLUSH_SECONDS (default: 15)
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    port = os.getenv("ACADEMIC_ASSISTANT_METRICS_PORT")
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        except OSError as e:
+            # Outro processo (ex.: outra sessão do Streamlit) já ocupa a porta
+            print(f"Aviso: servidor de métricas não iniciado na porta {port}: {e}", file=sys.stderr)
+
+    metrics_file = os.getenv("ACADEMIC_ASSISTANT_METRICS_FILE")
+    if metrics_file:
+        interval = float(os.getenv("ACADEMIC_ASSISTANT_METRICS_FLUSH_SECONDS", 15))
+        threading.Thread(target=_flush_loop, args=(metrics_file, interval), name="metrics-file", daemon=True).start()
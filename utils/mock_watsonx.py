@@ -0,0 +1,280 @@
+"""
+Servidor watsonx.ai simulado, para testes de carga offline.
+
+Implementa o suficiente da API REST para o CrewAI/LiteLLM e o SDK do watsonx
+funcionarem contra ele: token IAM, chat, geração de texto e embeddings.
+As respostas chegam com latência sorteada de distribuições realistas
+(log-normal por tamanho de modelo, mais tempo de decodificação por token)
+e uma taxa configurável de erros 5xx/429.
+
+Uso isolado:
+    python -m utils.mock_watsonx --port 8099
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+class LatencyProfile:
+    """
+    Latência de um modelo: tempo até o primeiro token log-normal
+    (mediana e sigma) + tokens de saída divididos pela vazão de decodificação.
+    """
+
+    def __init__(self, ttft_median: float, ttft_sigma: float, tokens_per_second: float, completion_median: int):
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_median = completion_median
+
+
+# Perfis aproximados por porte do modelo, escolhidos pelo nome (ex.: "8b", "70b", "405b")
+DEFAULT_PROFILES = {
+    "small": LatencyProfile(ttft_median=0.35, ttft_sigma=0.45, tokens_per_second=90, completion_median=280),
+    "medium": LatencyProfile(ttft_median=1.0, ttft_sigma=0.5, tokens_per_second=35, completion_median=380),
+    "large": LatencyProfile(ttft_median=2.2, ttft_sigma=0.55, tokens_per_second=14, completion_median=450),
+    "embedding": LatencyProfile(ttft_median=0.05, ttft_sigma=0.3, tokens_per_second=0, completion_median=0),
+}
+
+EMBEDDING_DIM = 768
+
+
+# Tamanho em bilhões de parâmetros no nome do modelo: "8b", "1.5b" ou "8x7b" (mistura de especialistas)
+_MODEL_SIZE_RE = re.compile(r"(?<![a-z0-9.])(?:(\d+)x)?(\d+(?:\.\d+)?)b(?![a-z0-9])")
+
+
+def model_size_billions(model_id: str) -> Optional[float]:
+    """Parâmetros totais (em bilhões) indicados no nome do modelo, ou None se não houver."""
+    matches = _MODEL_SIZE_RE.findall((model_id or "").lower())
+    if not matches:
+        return None
+    experts, size = matches[-1]
+    return float(size) * (int(experts) if experts else 1)
+
+
+def profile_for_model(model_id: str) -> str:
+    model_id = (model_id or "").lower()
+    if "embedding" in model_id or "slate" in model_id:
+        return "embedding"
+    size = model_size_billions(model_id)
+    if size is None:
+        return "medium"
+    if size <= 10:
+        return "small"
+    if size <= 100:
+        return "medium"
+    return "large"
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list:
+    """Vetor determinístico e normalizado derivado do hash do texto."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class MockWatsonX:
+    """Estado compartilhado do servidor: perfis, sorteios e contadores."""
+
+    def __init__(
+        self,
+        latency_scale: float = 1.0,
+        error_rate: float = 0.0,
+        slow_tail_rate: float = 0.01,
+        seed: Optional[int] = None,
+    ):
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.slow_tail_rate = slow_tail_rate
+        self.profiles: Dict[str, LatencyProfile] = dict(DEFAULT_PROFILES)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def sample(self, model_id: str, max_tokens: int) -> Tuple[float, int, int]:
+        """Sorteia (latência em segundos, tokens de saída, status de erro ou 0) para uma chamada."""
+        profile = self.profiles[profile_for_model(model_id)]
+        with self._lock:
+            self.requests += 1
+            ttft = profile.ttft_median * math.exp(self._rng.gauss(0, profile.ttft_sigma))
+            completion = 0
+            if profile.completion_median:
+                completion = int(profile.completion_median * math.exp(self._rng.gauss(0, 0.6)))
+                completion = max(1, min(completion, max_tokens or completion))
+            # Cauda pesada: uma fração pequena das chamadas fica várias vezes mais lenta
+            slow = self._rng.random() < self.slow_tail_rate
+            error_status = 0
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                error_status = self._rng.choice((429, 503))
+        decode = completion / profile.tokens_per_second if profile.tokens_per_second else 0.0
+        latency = (ttft + decode) * (5 if slow else 1) * self.latency_scale
+        return latency, completion, error_status
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _answer_text(prompt: str, completion_tokens: int) -> str:
+    # Formato ReAct esperado pelo agente do CrewAI para encerrar a tarefa
+    filler = "Resposta simulada pelo servidor watsonx de teste. "
+    body = (filler * (completion_tokens * 4 // len(filler) + 1))[: completion_tokens * 4]
+    return f"Thought: I now can give a great answer\nFinal Answer: {body.strip()}"
+
+
+def make_handler(state: MockWatsonX):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if not raw:
+                return {}
+            try:
+                return json.loads(raw)
+            except ValueError:
+                return {}
+
+        def _fail(self, status: int) -> None:
+            code = "too_many_requests" if status == 429 else "service_unavailable"
+            self._send_json(status, {"errors": [{"code": code, "message": "Falha simulada"}]})
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            payload = self._read_json()
+
+            if path in ("/identity/token", "/icp4d-api/v1/authorize"):
+                expires = int(time.time()) + 3600
+                self._send_json(200, {
+                    "access_token": "mock-token",
+                    "token": "mock-token",
+                    "refresh_token": "mock-refresh",
+                    "token_type": "Bearer",
+                    "expires_in": 3600,
+                    "expiration": expires,
+                })
+                return
+
+            model_id = payload.get("model_id", "")
+            if path.endswith("/text/embeddings"):
+                inputs = payload.get("inputs") or []
+                latency, _, error_status = state.sample(model_id, 0)
+                time.sleep(latency * max(1, len(inputs)) ** 0.5)
+                if error_status:
+                    self._fail(error_status)
+                    return
+                self._send_json(200, {
+                    "model_id": model_id,
+                    "results": [{"embedding": fake_embedding(text)} for text in inputs],
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "input_token_count": sum(_approx_tokens(t) for t in inputs),
+                })
+                return
+
+            if path.endswith("/text/chat") or path.endswith("/text/generation"):
+                if path.endswith("/text/chat"):
+                    prompt = "\n".join(str(m.get("content", "")) for m in payload.get("messages") or [])
+                    max_tokens = int(payload.get("max_tokens") or payload.get("max_new_tokens") or 1024)
+                else:
+                    prompt = payload.get("input", "")
+                    max_tokens = int((payload.get("parameters") or {}).get("max_new_tokens") or 1024)
+                latency, completion, error_status = state.sample(model_id, max_tokens)
+                time.sleep(latency)
+                if error_status:
+                    self._fail(error_status)
+                    return
+                text = _answer_text(prompt, completion)
+                finish = "length" if completion >= max_tokens else "stop"
+                prompt_tokens = _approx_tokens(prompt)
+                if path.endswith("/text/chat"):
+                    self._send_json(200, {
+                        "id": f"chat-{hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12]}",
+                        "model_id": model_id,
+                        "model": model_id,
+                        "created": int(time.time()),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish}],
+                        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion, "total_tokens": prompt_tokens + completion},
+                    })
+                else:
+                    self._send_json(200, {
+                        "model_id": model_id,
+                        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "results": [{
+                            "generated_text": text,
+                            "generated_token_count": completion,
+                            "input_token_count": prompt_tokens,
+                            "stop_reason": "max_tokens" if finish == "length" else "eos_token",
+                        }],
+                    })
+                return
+
+            self._send_json(404, {"errors": [{"code": "not_found", "message": f"Rota não simulada: {path}"}]})
+
+        def do_GET(self):
+            # Alguns clientes consultam especificações de modelos antes de chamar
+            if self.path.split("?")[0].endswith("/foundation_model_specs"):
+                self._send_json(200, {"resources": [], "total_count": 0})
+                return
+            self._send_json(404, {"errors": [{"code": "not_found", "message": self.path}]})
+
+    return Handler
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **state_kwargs) -> Tuple[ThreadingHTTPServer, MockWatsonX]:
+    """
+    Sobe o servidor simulado em uma thread daemon.
+
+    Returns:
+        O servidor (use `server.server_address` para a porta efetiva) e seu estado.
+    """
+    state = MockWatsonX(**state_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-watsonx", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor watsonx.ai simulado para testes offline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--escala-latencia", type=float, default=1.0, help="Multiplicador de todas as latências.")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="Fração de chamadas que falham (429/503).")
+    parser.add_argument("--seed", type=int, help="Semente dos sorteios de latência.")
+    args = parser.parse_args()
+
+    server, _ = start_mock_server(
+        args.host, args.port, latency_scale=args.escala_latencia, error_rate=args.taxa_erro, seed=args.seed
+    )
+    print(f"[+] watsonx simulado em http://{args.host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import yaml
+
+
+class ModelTier:
+    """Uma camada de modelo: identificador do modelo e orçamento de tokens de saída."""
+
+    def __init__(self, name: str, model: str, max_tokens: int, index: int):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"ModelTier({self.name!r}, {self.model!r}, max_tokens={self.max_tokens})"
+
+
+class RoutingDecision:
+    """Resultado da classificação de uma requisição: camada escolhida e o porquê."""
+
+    def __init__(self, tier: ModelTier, reasons: List[str]):
+        self.tier = tier
+        self.reasons = reasons
+
+
+class ModelRouter:
+    """
+    Roteamento de requisições entre camadas de modelo.
+
+    Classifica cada pergunta pelo task_key, tamanho e heurísticas de complexidade
+    (config/models.yaml) e escolhe a camada inicial; depois da resposta, decide se
+    vale refazer na camada seguinte (saída truncada ou de baixa confiança).
+    Também mantém a latência recente de cada camada.
+
+    Variáveis de ambiente opcionais:
+      - WATSONX_ROUTING_CONFIG (default: config/models.yaml)
+      - WATSONX_ROUTING_ENABLED (default: true; "false" usa sempre WATSONX_MODEL_ID)
+
+    `cfg` é o WatsonXConfig (utils/watson_llm.py): camadas sem `model` ou
+    `max_tokens` herdam `cfg.llm_model` e `cfg.max_tokens`.
+    """
+
+    LATENCY_WINDOW = 512
+
+    def __init__(self, cfg, config_path: Optional[str] = None):
+        self.cfg = cfg
+        self.config_path = config_path or os.getenv("WATSONX_ROUTING_CONFIG", "config/models.yaml")
+        enabled = os.getenv("WATSONX_ROUTING_ENABLED", "true").lower() not in ("0", "false", "no")
+
+        config = {}
+        if enabled:
+            try:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    config = yaml.safe_load(f) or {}
+            except FileNotFoundError:
+                config = {}
+
+        self.tiers = [
+            ModelTier(
+                name=t["name"],
+                model=t.get("model") or cfg.llm_model,
+                max_tokens=int(t.get("max_tokens") or cfg.max_tokens),
+                index=i,
+            )
+            for i, t in enumerate(config.get("tiers") or [])
+        ]
+        if not self.tiers:
+            # Sem configuração: uma única camada com o modelo do ambiente
+            self.tiers = [ModelTier("padrao", cfg.llm_model, cfg.max_tokens, 0)]
+
+        routing = config.get("routing") or {}
+        self.task_tiers = routing.get("task_tiers") or {}
+        self.default_tier = self.get_tier(routing.get("default_tier")) or self.tiers[len(self.tiers) // 2]
+        self.short_question_chars = int(routing.get("short_question_chars", 120))
+        self.long_question_chars = int(routing.get("long_question_chars", 600))
+        self.math_symbols = routing.get("math_symbols") or []
+        self.math_symbol_threshold = int(routing.get("math_symbol_threshold", 6))
+        self.complex_keywords = [[k.lower() for k in group] for group in routing.get("complex_keywords") or []]
+        self.simple_keywords = [k.lower() for k in routing.get("simple_keywords") or []]
+        self.low_confidence_phrases = [p.lower() for p in routing.get("low_confidence_phrases") or []]
+        self.low_confidence_chars = int(routing.get("low_confidence_chars", 200))
+        self.truncation_ratio = float(routing.get("truncation_ratio", 0.95))
+        self.max_escalations = int(routing.get("max_escalations", 1))
+
+        self._latencies: Dict[str, deque] = {t.name: deque(maxlen=self.LATENCY_WINDOW) for t in self.tiers}
+        self._lock = threading.Lock()
+
+    def get_tier(self, name: Optional[str]) -> Optional[ModelTier]:
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        return None
+
+    def route(self, task_key: str, question: str) -> RoutingDecision:
+        base = self.get_tier(self.task_tiers.get(task_key)) or self.default_tier
+        index = base.index
+        reasons = [f"task_key={task_key}->{base.name}"]
+
+        text = (question or "").lower()
+        complex_hits = [group[0] for group in self.complex_keywords if any(k in text for k in group)]
+        math_count = sum(text.count(sym) for sym in self.math_symbols)
+
+        if len(text) >= self.long_question_chars:
+            index += 1
+            reasons.append(f"longa ({len(text)} chars)")
+        if complex_hits:
+            index += len(complex_hits)
+            reasons.append(f"complexa ({', '.join(complex_hits)})")
+        if math_count >= self.math_symbol_threshold:
+            index += 1
+            reasons.append(f"notação densa ({math_count} símbolos)")
+        if (
+            len(text) <= self.short_question_chars
+            and not complex_hits
+            and math_count < self.math_symbol_threshold
+            and any(k in text for k in self.simple_keywords)
+        ):
+            index -= 1
+            reasons.append("curta e simples")
+
+        index = max(0, min(index, len(self.tiers) - 1))
+        return RoutingDecision(self.tiers[index], reasons)
+
+    def next_tier(self, tier: ModelTier) -> Optional[ModelTier]:
+        if tier.index + 1 < len(self.tiers):
+            return self.tiers[tier.index + 1]
+        return None
+
+    def escalation_reason(
+        self,
+        tier: ModelTier,
+        output: str,
+        completion_tokens: int = 0,
+        llm_calls: int = 1,
+    ) -> Optional[str]:
+        """
+        Diz por que a resposta deveria ser refeita numa camada maior, ou None se está boa.
+        A truncagem é estimada pela média de tokens de saída por chamada ao LLM; as frases
+        de baixa confiança só contam no início da resposta, já que expressões como
+        "não foi possível aplicar L'Hôpital" aparecem em explicações corretas.
+        """
+        if not output or not output.strip():
+            return "resposta vazia"
+        if completion_tokens and completion_tokens / max(llm_calls, 1) >= self.truncation_ratio * tier.max_tokens:
+            return f"truncada ({completion_tokens} tokens de saída, limite {tier.max_tokens})"
+        opening = output.strip().lower()[:self.low_confidence_chars]
+        for phrase in self.low_confidence_phrases:
+            if phrase in opening:
+                return f"baixa confiança ('{phrase}')"
+        return None
+
+    def record_latency(self, tier: ModelTier, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(tier.name, deque(maxlen=self.LATENCY_WINDOW)).append(seconds)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Contagem, média, p50 e p95 das latências recentes de cada camada."""
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._latencies.items()}
+        stats = {}
+        for name, values in snapshot.items():
+            if not values:
+                stats[name] = {"count": 0}
+                continue
+            stats[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p95": values[int(0.95 * (len(values) - 1))],
+            }
+        return stats
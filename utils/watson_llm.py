@@ -1,8 +1,12 @@
 # watsonx_llm.py
 import os
+from typing import Optional
+
 from dotenv import load_dotenv
 from crewai import LLM
 
+from utils.model_router import ModelRouter, ModelTier
+
 load_dotenv()
 
 
@@ -18,15 +22,15 @@ class WatsonXConfig:
         self.seed = int(os.getenv("SEED", 0))
         self.embed_model = os.getenv("WATSONX_EMBEDDER_MODEL_ID", "ibm/granite-embedding-278m-multilingual")
 
-    def build_llm(self) -> LLM:
+    def build_llm(self, model: Optional[str] = None, max_tokens: Optional[int] = None) -> LLM:
         return LLM(
-            model=self.llm_model,
+            model=model or self.llm_model,
             api_key=self.apikey,
             project_id=self.project_id,
             api_base=self.base_url,
             temperature=self.temperature,
             top_p=self.top_p,
-            max_tokens=self.max_tokens,
+            max_tokens=max_tokens or self.max_tokens,
             seed=self.seed,
         )
 
@@ -42,14 +46,40 @@ class WatsonXConfig:
             },
         }
 
+    def build_embeddings_client(self):
+        # Import tardio: só o build de índices precisa do SDK do watsonx diretamente
+        from ibm_watsonx_ai import Credentials
+        from ibm_watsonx_ai.foundation_models import Embeddings
+
+        return Embeddings(
+            model_id=self.embed_model,
+            credentials=Credentials(url=self.base_url, api_key=self.apikey),
+            project_id=self.project_id,
+        )
+
 
 # Singleton de fácil import
 _watsonx_cfg = WatsonXConfig()
+_router = ModelRouter(_watsonx_cfg)
 
 
-def get_llm() -> LLM:
-    return _watsonx_cfg.build_llm()
+def get_llm(tier: Optional[ModelTier] = None) -> LLM:
+    if tier is None:
+        return _watsonx_cfg.build_llm()
+    return _watsonx_cfg.build_llm(model=tier.model, max_tokens=tier.max_tokens)
+
+
+def get_router() -> ModelRouter:
+    return _router
 
 
 def get_embedder() -> dict:
     return _watsonx_cfg.build_embedder_config()
+
+
+def get_embed_model() -> str:
+    return _watsonx_cfg.embed_model
+
+
+def get_embeddings_client():
+    return _watsonx_cfg.build_embeddings_client()